@@ -1,19 +1,32 @@
 import os
 import typing
-from datetime import datetime
 
+import sqlalchemy as sa
 from dotenv import load_dotenv
 from flask_mail import Mail
-from flask import Flask, jsonify, render_template
+from flask import Flask, Response, jsonify, render_template, stream_with_context
+from flask_admin import BaseView, expose
 from flask_admin.contrib.sqla import ModelView
 from flask_cors import CORS
 
 from app.extensions import db, admin_ext, login_manager, migrate_ext
+from app.commands import register_commands
 from app.models import Users, Artworks, Nominations, Competitions, Ratings, Roles
+from app.services.dedup_service import DedupService
+from app.services.rating_service import RatingAggregateService
+from app.services.export_service import ExportService
+from app.utils.artwork_images import register_template_filters
+from app.utils.competitions_cache import competitions_cache
+from app.utils.config import JuryConfig, LocalStorageConfig
+from app.utils.minio_service import get_storage
+from app.utils.roles_cache import roles_cache
+from app.utils.user_cache import user_cache
 from app.utils.user_verification import active_user_required
+from logger_setup import setup_logger
 
 
 mail = Mail()
+logger = setup_logger('admin')
 
 
 def configure_extensions(app):
@@ -49,9 +62,20 @@ def create_app(testing=False):  # noqa: FBT002
     new_app.config['APPLICATION_ROOT'] = os.getenv('APPLICATION_ROOT', '/')
     new_app.config['PREFERRED_URL_SCHEME'] = os.getenv('PREFERRED_URL_SCHEME', 'http')
 
+    # Redis очереди задач и кэшей: соединения из общего пула, короткие таймауты
+    new_app.config['REDIS_URL'] = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+    new_app.config['REDIS_SOCKET_TIMEOUT'] = float(os.getenv('REDIS_SOCKET_TIMEOUT', 0.5))
+    new_app.config['REDIS_CONNECT_TIMEOUT'] = float(os.getenv('REDIS_CONNECT_TIMEOUT', 0.5))
+    new_app.config['REDIS_MAX_CONNECTIONS'] = int(os.getenv('REDIS_MAX_CONNECTIONS', 20))
+    # Что делать с задачей, если Redis недоступен:
+    # outbox - сохранить в базу, inline - выполнить сразу
+    new_app.config['TASKS_FALLBACK'] = os.getenv('TASKS_FALLBACK', 'outbox')
+
     mail.init_app(new_app)
 
     configure_extensions(new_app)
+    register_template_filters(new_app)
+    register_commands(new_app)
     CORS(new_app, resources={r"/*": {"origins": "*"}})
 
     @new_app.route("/ping")
@@ -61,14 +85,16 @@ def create_app(testing=False):  # noqa: FBT002
     @new_app.route("/")
     @active_user_required
     def index():
-        competitions = Competitions.query.filter(Competitions.end_of_accepting>datetime.now().strftime("%Y-%m-%d %H:%M:%S")).all()
+        competitions = competitions_cache.open_competitions()
         return render_template('index.html', competitions=competitions)
 
     from app.views.user import user_bp
     from app.views.application import application_bp
+    from app.views.storage import storage_bp
 
     new_app.register_blueprint(application_bp, url_prefix="/")
     new_app.register_blueprint(user_bp, url_prefix="/user")
+    new_app.register_blueprint(storage_bp, url_prefix=LocalStorageConfig.URL_PREFIX)
     return new_app
 
 
@@ -80,31 +106,119 @@ class UsersView(MyModelView):
     column_list = ("id", "f_name", "s_name", "age", "about_user", "email", "email_confirmed", "role_id", "status", )
     form_columns: typing.ClassVar = ["f_name", "s_name", "age", "about_user", "email", "email_confirmed", "role_id", "status"]
 
+    def after_model_change(self, form, model, is_created):
+        user_cache.invalidate(model.id)
+
+    def after_model_delete(self, model):
+        user_cache.invalidate(model.id)
+
 
 class ArtworksView(MyModelView):
     column_list = ["id", "file", "file_name", "status", "user_id", "nomination_id"]
     form_columns: typing.ClassVar = ["file", "file_name", "status", "user_id", "nomination_id"]
 
+    def on_model_change(self, form, model, is_created):
+        # Сводки оценок хранят номинацию работы: при переносе пересчитываются обе номинации
+        if not is_created and sa.inspect(model).attrs.nomination_id.history.has_changes():
+            self.session.flush()
+            RatingAggregateService(db).refresh([model.id])
+
+    def after_model_change(self, form, model, is_created):
+        # Одобренная работа получает назначения жюри в фоне
+        if JuryConfig.ASSIGNMENTS and model.status == 'active':
+            from app.tasks import JURY_ASSIGNMENTS_JOB_ID, update_jury_assignments
+            from app.utils.task_queue import TaskQueue
+            try:
+                TaskQueue().enqueue_unique(update_jury_assignments, job_id=JURY_ASSIGNMENTS_JOB_ID,
+                                           replace_finished=True, follow_started=True)
+            except Exception as e:
+                logger.error("Не удалось поставить задачу назначений жюри для работы %s: %s",
+                             model.id, e)
+
+    def after_model_delete(self, model):
+        RatingAggregateService(db).refresh([model.id], [model.nomination_id])
+        db.session.commit()
+
+        # Одинаковые файлы хранятся одним объектом: он удаляется вместе с последней заявкой
+        try:
+            DedupService(db, get_storage()).release(model.s3_key, model.derivatives)
+        except Exception as e:
+            logger.error("Не удалось удалить файл работы %s: %s", model.id, e)
+
 
 class NominationsView(MyModelView):
     column_list = ["id", "title", "winner_work_id", "competition_id", "status"]
     form_columns: typing.ClassVar = ["title", "winner_work_id", "competition_id", "status"]
 
+    def after_model_change(self, form, model, is_created):
+        competitions_cache.invalidate()
+
+    def after_model_delete(self, model):
+        competitions_cache.invalidate()
+
 
 class CompetitionsView(MyModelView):
     column_list = ["id", "title", "status", "start_of_accepting", "end_of_accepting", "summing_up"]
     form_columns: typing.ClassVar = ["title", "status", "start_of_accepting", "end_of_accepting", "summing_up"]
 
+    def after_model_change(self, form, model, is_created):
+        competitions_cache.invalidate()
+
+    def after_model_delete(self, model):
+        competitions_cache.invalidate()
+
 
 class RatingsView(MyModelView):
     column_list = ["id", "rate", "jury_comment", "work_id", "jury_id"]
     form_columns: typing.ClassVar = ["rate", "work_id", "jury_id"]
 
+    def on_model_change(self, form, model, is_created):
+        # Правка в обход RatingService: сводки прежней и новой работы пересчитываются
+        # в той же транзакции
+        work_ids = {model.work_id, *sa.inspect(model).attrs.work_id.history.deleted}
+        self.session.flush()
+        RatingAggregateService(db).refresh(work_ids)
+
+    def after_model_delete(self, model):
+        RatingAggregateService(db).refresh([model.work_id])
+        db.session.commit()
+
 
 class RolesView(MyModelView):
     column_list = ["id", "title", "display_name", "access"]
     form_columns: typing.ClassVar = ["id", "title", "display_name", "access"]
 
+    def after_model_change(self, form, model, is_created):
+        roles_cache.invalidate()
+
+    def after_model_delete(self, model):
+        roles_cache.invalidate()
+
+
+class ExportView(BaseView):
+    @expose('/')
+    def index(self):
+        competitions = Competitions.query.order_by(Competitions.id.desc()).all()
+        return self.render('admin/export.html', competitions=competitions)
+
+    @expose('/competition/<int:competition_id>')
+    def competition(self, competition_id):
+        return self._zip_response(f'competition_{competition_id}.zip',
+                                  competition_id=competition_id)
+
+    @expose('/nomination/<int:nomination_id>')
+    def nomination(self, nomination_id):
+        return self._zip_response(f'nomination_{nomination_id}.zip', nomination_id=nomination_id)
+
+    @staticmethod
+    def _zip_response(filename, **filters):
+        export_service = ExportService(get_storage())
+        return Response(
+            stream_with_context(export_service.stream_zip(**filters)),
+            mimetype='application/zip',
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+
 
 admin_ext.add_view(UsersView(Users, db.session))
 admin_ext.add_view(ArtworksView(Artworks, db.session))
@@ -112,3 +226,4 @@ admin_ext.add_view(NominationsView(Nominations, db.session))
 admin_ext.add_view(CompetitionsView(Competitions, db.session))
 admin_ext.add_view(RatingsView(Ratings, db.session))
 admin_ext.add_view(RolesView(Roles, db.session))
+admin_ext.add_view(ExportView(name='Выгрузка', endpoint='export'))
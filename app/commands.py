@@ -0,0 +1,240 @@
+import sys
+import time
+
+import click
+import sqlalchemy as sa
+from flask.cli import AppGroup
+from redis import RedisError
+
+from app.extensions import db
+from app.models import Artworks, Nominations, Ratings
+from app.services.export_service import ExportService
+from app.services.assignment_service import AssignmentService, NoJurors
+from app.services.notification_service import (
+    NotificationService, NotificationFinished, UnknownAudience, PARTICIPANTS, SUBJECTS
+)
+from app.services.rating_service import RatingAggregateService
+from app.services.results_service import ResultsService, NoRatings
+from app.services.upload_service import ResumableUploadService
+from app.utils.minio_service import get_storage
+from app.utils.task_queue import TaskQueue, get_redis, relay_outbox
+
+export_cli = AppGroup('export', help='Выгрузка работ')
+results_cli = AppGroup('results', help='Подведение итогов')
+ratings_cli = AppGroup('ratings', help='Оценки жюри')
+jury_cli = AppGroup('jury', help='Назначения жюри')
+notify_cli = AppGroup('notify', help='Рассылки участникам')
+tasks_cli = AppGroup('tasks', help='Фоновые задачи')
+uploads_cli = AppGroup('uploads', help='Загрузки частями')
+
+
+def _echo_job(job):
+    if job is None:
+        click.echo("Redis недоступен, задача отложена (см. TASKS_FALLBACK)")
+    else:
+        click.echo(f"Задача поставлена в очередь: {job.id}")
+
+
+@export_cli.command('artworks')
+@click.option('--competition', 'competition_id', type=int, help='ID конкурса')
+@click.option('--nomination', 'nomination_id', type=int, help='ID номинации')
+@click.option('--output', '-o', type=click.Path(dir_okay=False, allow_dash=True), default='-',
+              help='Файл архива (по умолчанию - stdout)')
+@click.option('--workers', type=int, default=4, help='Параллельных загрузок из хранилища')
+def export_artworks(competition_id, nomination_id, output, workers):
+    """Потоковая выгрузка работ конкурса или номинации в ZIP-архив"""
+    if competition_id is None and nomination_id is None:
+        raise click.UsageError('Укажите --competition или --nomination')
+
+    export_service = ExportService(get_storage(), workers=workers)
+    stream = sys.stdout.buffer if output == '-' else open(output, 'wb')
+    try:
+        for chunk in export_service.stream_zip(competition_id, nomination_id):
+            stream.write(chunk)
+    finally:
+        if stream is not sys.stdout.buffer:
+            stream.close()
+
+
+@results_cli.command('compute')
+@click.option('--competition', 'competition_id', type=int, required=True, help='ID конкурса')
+@click.option('--trim', type=click.FloatRange(0, 0.49), default=0.1, show_default=True,
+              help='Доля оценок, отбрасываемых с каждого края при усеченном среднем')
+@click.option('--min-ratings', type=int, default=1, show_default=True,
+              help='Минимум оценок для победы')
+@click.option('--dry-run', is_flag=True, help='Только показать победителей, не сохраняя')
+@click.option('--enqueue', is_flag=True, help='Выполнить в фоновой очереди RQ')
+def compute_results(competition_id, trim, min_ratings, dry_run, enqueue):
+    """Подсчет итогов конкурса и запись победителей номинаций"""
+    if enqueue:
+        from app.tasks import compute_competition_results
+        job = TaskQueue().enqueue(compute_competition_results, competition_id, trim, min_ratings)
+        _echo_job(job)
+        return
+
+    results_service = ResultsService(db)
+    try:
+        scores = results_service.compute(competition_id, trim=trim)
+    except NoRatings:
+        raise click.ClickException('Для конкурса нет оценок')
+
+    winners = scores.winners(min_ratings=min_ratings)
+    titles = dict(db.session.execute(
+        db.select(Nominations.id, Nominations.title).where(Nominations.id.in_(winners))
+    ).all())
+    works = dict(db.session.execute(
+        db.select(Artworks.id, Artworks.file_name).where(Artworks.id.in_(winners.values()))
+    ).all())
+    for nomination_id, work_id in winners.items():
+        title = titles.get(nomination_id, nomination_id)
+        click.echo(f"{title}: #{work_id} {works.get(work_id) or ''}")
+
+    if not dry_run:
+        results_service.save_winners(winners)
+        click.echo(f"Сохранено победителей: {len(winners)}")
+
+
+@ratings_cli.command('rebuild-aggregates')
+def rebuild_aggregates():
+    """Пересчет сводок оценок по таблице ratings с нуля"""
+    works = RatingAggregateService(db).rebuild()
+    db.session.commit()
+    click.echo(f"Сводки пересчитаны, работ с оценками: {works}")
+
+
+@ratings_cli.command('duplicates')
+@click.option('--delete', is_flag=True,
+              help='Удалить повторные оценки, оставив самую позднюю')
+def rating_duplicates(delete):
+    """Повторные оценки одной работы одним членом жюри (до уникального индекса ratings)"""
+    rows = db.session.execute(
+        sa.select(Ratings.id, Ratings.work_id, Ratings.jury_id, Ratings.rate)
+        .where(sa.tuple_(Ratings.work_id, Ratings.jury_id).in_(
+            sa.select(Ratings.work_id, Ratings.jury_id)
+            .group_by(Ratings.work_id, Ratings.jury_id)
+            .having(sa.func.count() > 1)
+        ))
+        .order_by(Ratings.work_id, Ratings.jury_id, Ratings.id)
+    ).all()
+    if not rows:
+        click.echo("Повторных оценок нет")
+        return
+
+    latest = {}
+    for row in rows:
+        latest[row.work_id, row.jury_id] = row.id
+    for row in rows:
+        mark = 'оставить' if latest[row.work_id, row.jury_id] == row.id else 'лишняя'
+        click.echo(f"работа {row.work_id}, жюри {row.jury_id}: "
+                   f"оценка {row.id} = {row.rate} ({mark})")
+
+    if not delete:
+        click.echo(f"Лишних оценок: {len(rows) - len(latest)}; "
+                   "для удаления запустите команду с --delete")
+        return
+    deleted = db.session.execute(
+        sa.delete(Ratings)
+        .where(Ratings.id.in_([row.id for row in rows]), Ratings.id.notin_(latest.values()))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    click.echo(f"Удалено оценок: {deleted}")
+
+
+@jury_cli.command('assign')
+@click.option('--competition', 'competition_id', type=int,
+              help='ID конкурса (по умолчанию - все открытые)')
+@click.option('--ratings-per-work', type=click.IntRange(1),
+              help='Сколько оценок должна получить работа')
+@click.option('--no-rebalance', is_flag=True, help='Не переносить назначения между членами жюри')
+def assign_jury(competition_id, ratings_per_work, no_rebalance):
+    """Добор назначений работ членам жюри и выравнивание нагрузки"""
+    assignment_service = AssignmentService(db, ratings_per_work)
+    try:
+        created = assignment_service.schedule(competition_id)
+        moved = 0 if no_rebalance else assignment_service.rebalance()
+    except NoJurors:
+        raise click.ClickException('Нет активных членов жюри')
+    db.session.commit()
+    click.echo(f"Создано назначений: {created}, перенесено: {moved}")
+
+
+def _enqueue_notification(notification_id):
+    from app.utils.email_queue import EmailQueue
+    _echo_job(EmailQueue().send_notification(notification_id))
+
+
+@notify_cli.command('send')
+@click.option('--kind', type=click.Choice(list(SUBJECTS)), required=True, help='Тип рассылки')
+@click.option('--competition', 'competition_id', type=int, required=True, help='ID конкурса')
+@click.option('--audience', default=PARTICIPANTS, show_default=True,
+              help='participants (авторы работ конкурса) или название роли')
+@click.option('--now', is_flag=True, help='Отправить в текущем процессе, без очереди RQ')
+def notify_send(kind, competition_id, audience, now):
+    """Массовая рассылка о конкурсе"""
+    from app import mail
+    notification_service = NotificationService(db, mail)
+    try:
+        notification = notification_service.create(kind, competition_id, audience)
+    except UnknownAudience:
+        raise click.ClickException(f'Неизвестная роль: {audience}')
+    if not now:
+        _enqueue_notification(notification.id)
+        return
+    sent, failed = notification_service.send(notification.id)
+    click.echo(f"Рассылка {notification.id}: отправлено {sent}, с ошибкой {failed}")
+
+
+@notify_cli.command('resume')
+@click.argument('notification_id', type=int)
+@click.option('--now', is_flag=True, help='Отправить в текущем процессе, без очереди RQ')
+def notify_resume(notification_id, now):
+    """Продолжение прерванной рассылки с контрольной точки"""
+    from app import mail
+    if not now:
+        _enqueue_notification(notification_id)
+        return
+    try:
+        sent, failed = NotificationService(db, mail).send(notification_id)
+    except NotificationFinished:
+        raise click.ClickException('Рассылка не найдена или уже завершена')
+    click.echo(f"Рассылка {notification_id}: отправлено {sent}, с ошибкой {failed}")
+
+
+@tasks_cli.command('relay')
+@click.option('--interval', type=click.IntRange(1),
+              help='Повторять каждые N секунд, пока не прервут')
+def relay_tasks(interval):
+    """Перенос задач, отложенных в базу при недоступности Redis, в очереди RQ"""
+    while True:
+        try:
+            relayed = relay_outbox()
+        except RedisError as e:
+            if not interval:
+                raise click.ClickException(f'Redis недоступен: {e}')
+            relayed = 0
+        if relayed or not interval:
+            click.echo(f"Перенесено задач: {relayed}")
+        if not interval:
+            return
+        time.sleep(interval)
+
+
+@uploads_cli.command('cleanup')
+def cleanup_uploads():
+    """Отмена в хранилище брошенных загрузок частями, состояние которых истекло"""
+    try:
+        aborted = ResumableUploadService(get_redis(), get_storage()).abort_expired()
+    except RedisError as e:
+        raise click.ClickException(f'Redis недоступен: {e}')
+    click.echo(f"Отменено загрузок: {aborted}")
+
+
+def register_commands(app):
+    app.cli.add_command(export_cli)
+    app.cli.add_command(results_cli)
+    app.cli.add_command(ratings_cli)
+    app.cli.add_command(jury_cli)
+    app.cli.add_command(notify_cli)
+    app.cli.add_command(tasks_cli)
+    app.cli.add_command(uploads_cli)
@@ -1,17 +1,23 @@
 import pytz
 from datetime import datetime, timedelta
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Boolean
+from sqlalchemy import (
+    Column, DateTime, ForeignKey, Integer, String, Boolean, JSON, Index, UniqueConstraint, Float
+)
 from sqlalchemy.orm import relationship
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 
 
 from app.extensions import db, login_manager
+from app.utils.roles_cache import roles_cache
 
 
 @login_manager.user_loader
 def load_user(id):
-    return db.session.get(Users, int(id))
+    # Снимок пользователя из Redis, роль - из кэша roles_cache;
+    # полная строка Users загружается, только если ее поля нужны представлению
+    from app.utils.user_cache import user_cache
+    return user_cache.load(int(id))
 
 
 class Roles(db.Model):
@@ -29,7 +35,7 @@ class Users(UserMixin, db.Model):
     s_name = Column(String(20), nullable=False)
     age = Column(Integer, nullable=False)
     about_user = Column(String(900))
-    email = Column(String(254), nullable=False)
+    email = Column(String(254), nullable=False, unique=True, index=True)
     email_confirmed = db.Column(db.Boolean, default=False)
     password_hash = Column(db.String(256), nullable=False)
     status = Column(String(20), nullable=True)
@@ -43,6 +49,15 @@ class Users(UserMixin, db.Model):
 
     created_at = db.Column(db.DateTime, default=datetime.now(pytz.UTC))
 
+    @property
+    def role(self):
+        """Роль пользователя (RoleInfo) из кэша без обращения к базе"""
+        return roles_cache.get(self.role_id)
+
+    def load(self):
+        """Совместимость с UserSnapshot: полная строка уже загружена"""
+        return self
+
     def generate_token(self, token_type='verification', status='pending'):
         """
         Универсальный метод генерации токена
@@ -63,6 +78,20 @@ class Users(UserMixin, db.Model):
 
         return token
 
+    def ensure_token(self, token_type='verification', hours=1):
+        """
+        Действующий токен или новый, если прежний истек
+
+        :return: (токен, создан ли новый)
+        """
+        if token_type == 'verification':
+            token = self.verification_token
+        else:
+            token = self.reset_password_token
+        if token and not self.is_token_expired(token_type, hours):
+            return token, False
+        return self.generate_token(token_type), True
+
     def is_token_expired(self, token_type='verification', hours=1):
         """
         Универсальный метод проверки истечения срока действия токена
@@ -114,11 +143,26 @@ class Users(UserMixin, db.Model):
 
 class Artworks(db.Model):
     __tablename__ = "artworks"
+    __table_args__ = (
+        Index("ix_artworks_user_id_nomination_id", "user_id", "nomination_id"),
+        Index("ix_artworks_status", "status"),
+        Index("ix_artworks_nomination_id_id", "nomination_id", "id"),
+    )
     id = Column(Integer, primary_key=True)
     file = Column(String(1024))
     s3_key = Column(String(1024))
     file_name = Column(String(254))
     status = Column(String(20))
+    # Ключи уменьшенных копий: {"jpg": {"320": key, ...}, "webp": {...}}
+    derivatives = Column(JSON, nullable=True)
+    # SHA-256 содержимого файла
+    content_hash = Column(String(64), index=True)
+    # Метаданные изображения, извлеченные при загрузке
+    width = Column(Integer)
+    height = Column(Integer)
+    camera = Column(String(100))
+    taken_at = Column(DateTime)
+    orientation = Column(Integer)
 
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     nomination_id = Column(Integer, ForeignKey("nominations.id"), nullable=False)
@@ -126,6 +170,25 @@ class Artworks(db.Model):
     author = db.relationship('Users', backref='artworks', foreign_keys=[user_id])
     nomination = db.relationship('Nominations', backref='artworks', foreign_keys=[nomination_id])
 
+    def set_image_metadata(self, metadata):
+        """Заполняет поля метаданных из ImageMetadata"""
+        self.width = metadata.width
+        self.height = metadata.height
+        self.camera = metadata.camera
+        self.taken_at = metadata.taken_at
+        self.orientation = metadata.orientation
+
+
+class StoredFiles(db.Model):
+    """Индекс загруженных файлов по содержимому: один объект в хранилище на один SHA-256"""
+    __tablename__ = "stored_files"
+    id = Column(Integer, primary_key=True)
+    sha256 = Column(String(64), nullable=False, unique=True)
+    s3_key = Column(String(1024), nullable=False)
+    size = Column(Integer)
+    content_type = Column(String(100))
+    created_at = Column(DateTime, default=lambda: datetime.now(pytz.UTC))
+
 
 class Nominations(db.Model):
     __tablename__ = "nominations"
@@ -144,16 +207,99 @@ class Competitions(db.Model):
     title = Column(String(254))
     status = Column(String(20))
     start_of_accepting = Column(DateTime)
-    end_of_accepting = Column(DateTime)
-    summing_up = Column(DateTime)
+    end_of_accepting = Column(DateTime, index=True)
+    summing_up = Column(DateTime, index=True)
 
     nominations = relationship("Nominations", backref="competition")
 
 
 class Ratings(db.Model):
     __tablename__ = "ratings"
+    __table_args__ = (
+        UniqueConstraint("work_id", "jury_id", name="uq_ratings_work_id_jury_id"),
+    )
     id = Column(Integer, primary_key=True)
     rate = Column(Integer)
     jury_comment = Column(String(254))
     work_id = Column(Integer, ForeignKey("artworks.id"), nullable=False)
+    jury_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+
+
+class JuryAssignments(db.Model):
+    """Очередь работ члена жюри; position задает порядок в ленте голосования"""
+    __tablename__ = "jury_assignments"
+    __table_args__ = (
+        UniqueConstraint("jury_id", "work_id", name="uq_jury_assignments_jury_id_work_id"),
+        Index("ix_jury_assignments_jury_id_position", "jury_id", "position"),
+    )
+    id = Column(Integer, primary_key=True)
     jury_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    work_id = Column(Integer, ForeignKey("artworks.id", ondelete="CASCADE"), nullable=False,
+                     index=True)
+    position = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=lambda: datetime.now(pytz.UTC))
+    completed_at = Column(DateTime)
+
+    jury = db.relationship('Users', foreign_keys=[jury_id])
+    work = db.relationship('Artworks', foreign_keys=[work_id])
+
+
+class Notifications(db.Model):
+    """Массовая рассылка; last_user_id - контрольная точка для продолжения после сбоя"""
+    __tablename__ = "notifications"
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(50), nullable=False)
+    # participants - авторы работ конкурса, иначе название роли
+    audience = Column(String(50), nullable=False)
+    competition_id = Column(Integer, ForeignKey("competitions.id"), nullable=True)
+    status = Column(String(20), nullable=False, default='pending')
+    last_user_id = Column(Integer, nullable=False, default=0)
+    sent_count = Column(Integer, nullable=False, default=0)
+    failed_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=lambda: datetime.now(pytz.UTC))
+    finished_at = Column(DateTime)
+
+    competition = db.relationship('Competitions', foreign_keys=[competition_id])
+
+
+class TaskOutbox(db.Model):
+    """Фоновые задачи, отложенные в базу, пока Redis недоступен"""
+    __tablename__ = "task_outbox"
+    id = Column(Integer, primary_key=True)
+    queue = Column(String(50), nullable=False)
+    func = Column(String(254), nullable=False)
+    args = Column(JSON, nullable=False)
+    kwargs = Column(JSON, nullable=False)
+    # Параметры постановки в очередь RQ (job_id, job_timeout, retry...)
+    options = Column(JSON, nullable=False)
+    job_id = Column(String(100), index=True)
+    created_at = Column(DateTime, default=lambda: datetime.now(pytz.UTC))
+
+
+class RatingAggregates(db.Model):
+    """Сводка оценок работы; обновляется приращениями вместе с ratings"""
+    __tablename__ = "rating_aggregates"
+    __table_args__ = (
+        Index("ix_rating_aggregates_nomination_id_rate_mean", "nomination_id", "rate_mean"),
+    )
+    work_id = Column(Integer, ForeignKey("artworks.id", ondelete="CASCADE"), primary_key=True)
+    nomination_id = Column(Integer, ForeignKey("nominations.id"), nullable=False)
+    ratings_count = Column(Integer, nullable=False, default=0)
+    rate_sum = Column(Integer, nullable=False, default=0)
+    rate_sum_squares = Column(Integer, nullable=False, default=0)
+    rate_min = Column(Integer)
+    rate_max = Column(Integer)
+    rate_mean = Column(Float)
+
+    work = db.relationship('Artworks', foreign_keys=[work_id])
+
+
+class NominationRatingAggregates(db.Model):
+    """Сводка оценок по номинации"""
+    __tablename__ = "nomination_rating_aggregates"
+    nomination_id = Column(Integer, ForeignKey("nominations.id", ondelete="CASCADE"),
+                           primary_key=True)
+    rated_works = Column(Integer, nullable=False, default=0)
+    ratings_count = Column(Integer, nullable=False, default=0)
+    rate_sum = Column(Integer, nullable=False, default=0)
+    rate_sum_squares = Column(Integer, nullable=False, default=0)
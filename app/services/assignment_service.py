@@ -0,0 +1,283 @@
+import heapq
+import math
+from collections import Counter, defaultdict
+from datetime import datetime
+
+import pytz
+import sqlalchemy as sa
+
+from app.models import (
+    Artworks, Competitions, JuryAssignments, Nominations, Ratings, Roles, Users
+)
+from app.utils.advisory_lock import JURY_ASSIGNMENTS_LOCK, advisory_xact_lock
+from app.utils.config import JuryConfig
+
+
+class AssignmentServiceException(Exception):
+    pass
+
+
+class NoJurors(AssignmentServiceException):
+    pass
+
+
+class AssignmentService:
+    """
+    Распределение работ между членами жюри.
+
+    Каждая работа назначается не менее чем ratings_per_work разным членам жюри,
+    работа не назначается своему автору, новые назначения достаются наименее
+    загруженным. Расчет инкрементальный: schedule добирает назначения только
+    работам, у которых их не хватает, rebalance переносит только лишние.
+    Оба расчета выполняются под общей блокировкой до конца транзакции, поэтому
+    параллельные запуски не назначают работу дважды.
+    """
+
+    def __init__(self, db, ratings_per_work=None):
+        self.db = db
+        self.ratings_per_work = ratings_per_work or JuryConfig.RATINGS_PER_WORK
+
+    def _jurors(self):
+        """Активные члены жюри"""
+        return self.db.session.execute(
+            sa.select(Users.id)
+            .join(Roles, Users.role_id == Roles.id)
+            .where(Roles.title == 'jury', Users.status == 'active')
+            .order_by(Users.id)
+        ).scalars().all()
+
+    @staticmethod
+    def _open_works(competition_id=None):
+        """Активные работы конкурсов, по которым еще идет голосование"""
+        query = (
+            sa.select(Artworks.id)
+            .join(Nominations, Artworks.nomination_id == Nominations.id)
+            .join(Competitions, Nominations.competition_id == Competitions.id)
+            .where(Artworks.status == 'active', Competitions.summing_up > datetime.now())
+        )
+        if competition_id:
+            query = query.where(Competitions.id == competition_id)
+        return query
+
+    def _open_loads(self, jurors):
+        """Число незавершенных назначений по открытым работам у каждого члена жюри"""
+        loads = dict.fromkeys(jurors, 0)
+        loads.update(self.db.session.execute(
+            sa.select(JuryAssignments.jury_id, sa.func.count())
+            .where(
+                JuryAssignments.completed_at.is_(None),
+                JuryAssignments.work_id.in_(self._open_works())
+            )
+            .group_by(JuryAssignments.jury_id)
+        ).all())
+        return loads
+
+    def _next_positions(self):
+        """Следующая свободная позиция в очереди каждого члена жюри"""
+        rows = self.db.session.execute(
+            sa.select(JuryAssignments.jury_id, sa.func.max(JuryAssignments.position))
+            .group_by(JuryAssignments.jury_id)
+        ).all()
+        positions = defaultdict(int)
+        positions.update({jury_id: position + 1 for jury_id, position in rows})
+        return positions
+
+    def _taken(self, work_ids):
+        """
+        Члены жюри, которые уже получили работу или оценили ее без назначения:
+        {work_id: {jury_id: назначена ли}}
+        """
+        taken = defaultdict(dict)
+        for work_id, jury_id in self.db.session.execute(
+            sa.select(Ratings.work_id, Ratings.jury_id).where(Ratings.work_id.in_(work_ids))
+        ):
+            taken[work_id][jury_id] = False
+        for work_id, jury_id in self.db.session.execute(
+            sa.select(JuryAssignments.work_id, JuryAssignments.jury_id)
+            .where(JuryAssignments.work_id.in_(work_ids))
+        ):
+            taken[work_id][jury_id] = True
+        return taken
+
+    def schedule(self, competition_id=None):
+        """
+        Добирает назначения работам, у которых их меньше ratings_per_work;
+        возвращает число новых
+        """
+        advisory_xact_lock(self.db.session, JURY_ASSIGNMENTS_LOCK)
+        jurors = self._jurors()
+        if not jurors:
+            raise NoJurors()
+
+        assigned = (
+            sa.select(JuryAssignments.work_id, sa.func.count().label('assigned'))
+            .group_by(JuryAssignments.work_id)
+            .subquery()
+        )
+        works = self.db.session.execute(
+            sa.select(Artworks.id, Artworks.user_id)
+            .outerjoin(assigned, assigned.c.work_id == Artworks.id)
+            .where(
+                Artworks.id.in_(self._open_works(competition_id)),
+                sa.func.coalesce(assigned.c.assigned, 0) < self.ratings_per_work
+            )
+            .order_by(Artworks.id)
+        ).all()
+        if not works:
+            return 0
+
+        taken = self._taken([work_id for work_id, _ in works])
+        positions = self._next_positions()
+        loads = self._open_loads(jurors)
+        heap = [(load, jury_id) for jury_id, load in loads.items()]
+        heapq.heapify(heap)
+
+        now = datetime.now(pytz.UTC)
+        rows = []
+        for work_id, author_id in works:
+            work_taken = taken[work_id]
+            # Оценки, выставленные до назначений, засчитываются как выполненные назначения
+            for jury_id, is_assigned in work_taken.items():
+                if not is_assigned:
+                    rows.append({'jury_id': jury_id, 'work_id': work_id,
+                                 'position': positions[jury_id],
+                                 'created_at': now, 'completed_at': now})
+                    positions[jury_id] += 1
+
+            need = self.ratings_per_work - len(work_taken)
+            skipped = []
+            while need > 0 and heap:
+                load, jury_id = heapq.heappop(heap)
+                if jury_id == author_id or jury_id in work_taken:
+                    skipped.append((load, jury_id))
+                    continue
+                rows.append({'jury_id': jury_id, 'work_id': work_id,
+                             'position': positions[jury_id], 'created_at': now})
+                positions[jury_id] += 1
+                work_taken[jury_id] = True
+                skipped.append((load + 1, jury_id))
+                need -= 1
+            for item in skipped:
+                heapq.heappush(heap, item)
+
+        if rows:
+            self.db.session.execute(sa.insert(JuryAssignments), rows)
+        return len(rows)
+
+    def rebalance(self):
+        """
+        Переносит незавершенные назначения от перегруженных и выбывших членов жюри
+        к наименее загруженным; возвращает число перенесенных назначений.
+        Переносятся работы из конца очереди, до которых член жюри еще не дошел.
+        """
+        advisory_xact_lock(self.db.session, JURY_ASSIGNMENTS_LOCK)
+        jurors = self._jurors()
+        if not jurors:
+            raise NoJurors()
+        active = set(jurors)
+
+        pending = self.db.session.execute(
+            sa.select(JuryAssignments.id, JuryAssignments.jury_id, JuryAssignments.work_id,
+                      Artworks.user_id)
+            .join(Artworks, JuryAssignments.work_id == Artworks.id)
+            .where(
+                JuryAssignments.completed_at.is_(None),
+                JuryAssignments.work_id.in_(self._open_works())
+            )
+            .order_by(JuryAssignments.jury_id, JuryAssignments.position.desc())
+        ).all()
+        if not pending:
+            return 0
+
+        loads = Counter({jury_id: 0 for jury_id in jurors})
+        loads.update(row.jury_id for row in pending if row.jury_id in active)
+        target = math.ceil(len(pending) / len(jurors))
+
+        # Назначения выбывших - целиком, у перегруженных - сверх target с конца очереди
+        surplus = Counter({jury_id: load - target
+                           for jury_id, load in loads.items() if load > target})
+        movable = []
+        for row in pending:
+            if row.jury_id not in active:
+                movable.append(row)
+            elif surplus[row.jury_id] > 0:
+                movable.append(row)
+                surplus[row.jury_id] -= 1
+        if not movable:
+            return 0
+
+        taken = self._taken([row.work_id for row in movable])
+        positions = self._next_positions()
+        heap = [(load, jury_id) for jury_id, load in loads.items()]
+        heapq.heapify(heap)
+
+        updates = []
+        for row in movable:
+            skipped = []
+            receiver = None
+            while heap:
+                load, jury_id = heapq.heappop(heap)
+                skipped.append((load, jury_id))
+                if jury_id == row.user_id or jury_id in taken[row.work_id]:
+                    continue
+                # Перегруженному члену жюри переносить некуда, если у получателя не меньше работ
+                if row.jury_id in active and load + 1 >= loads[row.jury_id]:
+                    break
+                receiver = jury_id
+                skipped[-1] = (load + 1, jury_id)
+                break
+            for item in skipped:
+                heapq.heappush(heap, item)
+            if receiver is None:
+                continue
+
+            if row.jury_id in active:
+                loads[row.jury_id] -= 1
+            loads[receiver] += 1
+            taken[row.work_id][receiver] = True
+            updates.append({'assignment_id': row.id, 'receiver_id': receiver,
+                            'receiver_position': positions[receiver]})
+            positions[receiver] += 1
+
+        if not updates:
+            return 0
+        # Назначение, которое член жюри успел выполнить, пока шел расчет, не переносится
+        assignments = JuryAssignments.__table__
+        self.db.session.execute(
+            sa.update(assignments)
+            .where(
+                assignments.c.id == sa.bindparam('assignment_id'),
+                assignments.c.completed_at.is_(None)
+            )
+            .values(jury_id=sa.bindparam('receiver_id'),
+                    position=sa.bindparam('receiver_position')),
+            updates
+        )
+        return len(updates)
+
+    def complete(self, jury_id, work_ids):
+        """Отмечает назначения выполненными после выставления оценок; возвращает их число"""
+        if not work_ids:
+            return 0
+        return self.db.session.execute(
+            sa.update(JuryAssignments)
+            .where(
+                JuryAssignments.jury_id == jury_id,
+                JuryAssignments.work_id.in_(work_ids),
+                JuryAssignments.completed_at.is_(None)
+            )
+            .values(completed_at=datetime.now(pytz.UTC))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+    def pending_count(self, jury_id):
+        """Сколько назначенных работ члену жюри осталось оценить"""
+        return self.db.session.execute(
+            sa.select(sa.func.count())
+            .select_from(JuryAssignments)
+            .where(
+                JuryAssignments.jury_id == jury_id,
+                JuryAssignments.completed_at.is_(None),
+                JuryAssignments.work_id.in_(self._open_works())
+            )
+        ).scalar_one()
@@ -0,0 +1,92 @@
+from sqlalchemy.exc import IntegrityError
+
+from app.models import Artworks, StoredFiles
+
+
+class DedupServiceException(Exception):
+    pass
+
+
+class DuplicateSubmission(DedupServiceException):
+    pass
+
+
+class DedupService:
+    """
+    Дедупликация загруженных работ по SHA-256 содержимого.
+
+    Для каждого хеша в stored_files хранится один объект хранилища; новые
+    заявки с тем же содержимым ссылаются на него, а только что загруженная
+    копия удаляется. Общий объект удаляется только вместе с последней
+    ссылающейся на него заявкой.
+    """
+
+    def __init__(self, db, storage):
+        self.db = db
+        self.storage = storage
+
+    def check_nomination(self, sha256, nomination_id, exclude_id=None):
+        """
+        Одну и ту же работу нельзя подать в номинацию дважды;
+        exclude_id - уже созданная заявка, которую проверяем.
+        """
+        query = Artworks.query.filter_by(
+            content_hash=sha256,
+            nomination_id=nomination_id
+        )
+        if exclude_id is not None:
+            query = query.filter(Artworks.id != exclude_id)
+        duplicate = query.first()
+        if duplicate:
+            raise DuplicateSubmission()
+
+    def resolve(self, sha256, s3_key, size=None, content_type=None):
+        """
+        Возвращает ключ объекта, на который должна ссылаться заявка.
+
+        Если файл с таким содержимым уже хранится, только что загруженный
+        объект s3_key удаляется и возвращается ключ существующего.
+        """
+        stored = StoredFiles.query.filter_by(sha256=sha256).first()
+        if stored is None:
+            try:
+                with self.db.session.begin_nested():
+                    self.db.session.add(StoredFiles(sha256=sha256, s3_key=s3_key,
+                                                    size=size, content_type=content_type))
+                return s3_key
+            except IntegrityError:
+                # Тот же файл параллельно зарегистрировал другой запрос
+                stored = StoredFiles.query.filter_by(sha256=sha256).one()
+
+        if stored.s3_key != s3_key:
+            self.storage.delete(s3_key)
+        return stored.s3_key
+
+    def discard(self, s3_key):
+        """Удаляет загруженный объект, если на него не ссылается индекс"""
+        if not StoredFiles.query.filter_by(s3_key=s3_key).first():
+            self.storage.delete(s3_key)
+
+    def release(self, s3_key, derivatives=None):
+        """
+        Вызывается после удаления заявки: удаляет объект, его уменьшенные копии
+        и запись индекса, если на объект больше не ссылается ни одна заявка.
+        """
+        if not s3_key or Artworks.query.filter_by(s3_key=s3_key).first():
+            return False
+        for sizes in (derivatives or {}).values():
+            for key in sizes.values():
+                self.storage.delete(key)
+        self.storage.delete(s3_key)
+        StoredFiles.query.filter_by(s3_key=s3_key).delete()
+        self.db.session.commit()
+        return True
+
+    @staticmethod
+    def existing_derivatives(s3_key):
+        """Готовые уменьшенные копии объекта от другой заявки, если есть"""
+        artwork = Artworks.query.filter(
+            Artworks.s3_key == s3_key,
+            Artworks.derivatives.isnot(None)
+        ).first()
+        return artwork.derivatives if artwork else None
@@ -0,0 +1,178 @@
+import csv
+import io
+import queue
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import sqlalchemy as sa
+
+from app.extensions import db
+from app.models import Artworks, Nominations, Users, Ratings
+
+
+class ExportServiceException(Exception):
+    pass
+
+
+class ExportCancelled(ExportServiceException):
+    pass
+
+
+MANIFEST_COLUMNS = [
+    'artwork_id', 'archive_path', 'title', 'status', 'nomination_id', 'nomination',
+    'author_id', 'author', 'author_email', 'ratings_count', 'rating_avg',
+    'width', 'height', 'camera', 'taken_at', 's3_key',
+]
+
+
+class _ChunkWriter:
+    """Несжимаемый буфер вывода: ZipFile пишет в него, генератор забирает накопленное"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class ExportService:
+    """
+    Потоковая выгрузка работ в ZIP-архив.
+
+    Архив собирается на лету: объекты читаются из хранилища частями
+    в workers потоков, каждый поток держит не больше queue_size частей,
+    поэтому память ограничена workers * queue_size * chunk_size независимо
+    от размера выгрузки. В конце архива добавляется manifest.csv.
+    """
+
+    def __init__(self, storage, workers=4, chunk_size=1024 * 1024, queue_size=4):
+        self.storage = storage
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.queue_size = queue_size
+
+    @staticmethod
+    def manifest_query(competition_id=None, nomination_id=None):
+        """Работы вместе с автором, номинацией и сводкой оценок - одним запросом"""
+        ratings = (
+            sa.select(
+                Ratings.work_id,
+                sa.func.count(Ratings.id).label('ratings_count'),
+                sa.func.avg(Ratings.rate).label('rating_avg')
+            )
+            .group_by(Ratings.work_id)
+            .subquery()
+        )
+        query = (
+            sa.select(
+                Artworks.id, Artworks.s3_key, Artworks.file_name, Artworks.status,
+                Artworks.width, Artworks.height, Artworks.camera, Artworks.taken_at,
+                Nominations.id.label('nomination_id'), Nominations.title.label('nomination'),
+                Users.id.label('author_id'), Users.f_name, Users.s_name, Users.email,
+                sa.func.coalesce(ratings.c.ratings_count, 0).label('ratings_count'),
+                ratings.c.rating_avg
+            )
+            .join(Nominations, Artworks.nomination_id == Nominations.id)
+            .join(Users, Artworks.user_id == Users.id)
+            .outerjoin(ratings, ratings.c.work_id == Artworks.id)
+            .where(Artworks.s3_key.isnot(None))
+            .order_by(Nominations.id, Artworks.id)
+        )
+        if competition_id is not None:
+            query = query.where(Nominations.competition_id == competition_id)
+        if nomination_id is not None:
+            query = query.where(Nominations.id == nomination_id)
+        return query
+
+    @staticmethod
+    def archive_path(row):
+        extension = row.s3_key.rsplit('.', 1)[-1] if '.' in row.s3_key else 'jpg'
+        return f"nomination_{row.nomination_id}/{row.id}.{extension}"
+
+    def _fetch(self, s3_key, chunks, cancelled):
+        """Читает объект в очередь chunks; None означает конец, исключение - ошибку"""
+        try:
+            for chunk in self.storage.iter_chunks(s3_key, self.chunk_size):
+                self._put(chunks, chunk, cancelled)
+            self._put(chunks, None, cancelled)
+        except ExportCancelled:
+            pass
+        except Exception as e:
+            self._put(chunks, e, cancelled)
+
+    @staticmethod
+    def _put(chunks, item, cancelled):
+        while True:
+            if cancelled.is_set():
+                raise ExportCancelled()
+            try:
+                chunks.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def stream_zip(self, competition_id=None, nomination_id=None):
+        """Генератор байтов ZIP-архива с работами и manifest.csv"""
+        rows = db.session.execute(self.manifest_query(competition_id, nomination_id)).all()
+
+        output = _ChunkWriter()
+        cancelled = threading.Event()
+        pending = deque()
+        rows_iter = iter(rows)
+
+        def schedule(pool):
+            # В работе одновременно не больше workers объектов
+            while len(pending) < self.workers:
+                row = next(rows_iter, None)
+                if row is None:
+                    return
+                chunks = queue.Queue(maxsize=self.queue_size)
+                pool.submit(self._fetch, row.s3_key, chunks, cancelled)
+                pending.append((row, chunks))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            try:
+                with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED,
+                                     allowZip64=True) as archive:
+                    schedule(pool)
+                    while pending:
+                        row, chunks = pending.popleft()
+                        schedule(pool)
+                        with archive.open(self.archive_path(row), 'w', force_zip64=True) as entry:
+                            while (chunk := chunks.get()) is not None:
+                                if isinstance(chunk, Exception):
+                                    raise chunk
+                                entry.write(chunk)
+                                if data := output.drain():
+                                    yield data
+
+                    archive.writestr('manifest.csv', self.manifest_csv(rows))
+                yield output.drain()
+            finally:
+                cancelled.set()
+
+    def manifest_csv(self, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(MANIFEST_COLUMNS)
+        for row in rows:
+            writer.writerow([
+                row.id, self.archive_path(row), row.file_name, row.status, row.nomination_id,
+                row.nomination, row.author_id, f"{row.f_name} {row.s_name}", row.email,
+                row.ratings_count, round(row.rating_avg, 2) if row.rating_avg is not None else '',
+                row.width, row.height, row.camera, row.taken_at.isoformat() if row.taken_at else '',
+                row.s3_key,
+            ])
+        # BOM, чтобы Excel правильно открывал кириллицу
+        return '\ufeff' + buffer.getvalue()
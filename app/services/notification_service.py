@@ -0,0 +1,176 @@
+import smtplib
+import time
+from datetime import datetime
+
+import pytz
+import sqlalchemy as sa
+from flask import current_app, render_template, url_for
+from flask_mail import Message
+from markupsafe import escape
+
+from app.models import Artworks, Competitions, Nominations, Notifications, Roles, Users
+from app.utils.config import NotificationConfig
+from app.utils.mailer import get_smtp_session
+from logger_setup import setup_logger
+
+logger = setup_logger('notifications')
+
+SUBJECTS = {
+    'competition_opened': "Открыт прием работ - Фотоконкурс",
+    'competition_closed': "Прием работ завершен - Фотоконкурс",
+    'winners_announced': "Итоги конкурса - Фотоконкурс",
+}
+
+# Аудитория из авторов работ конкурса; иначе аудиторией считается название роли
+PARTICIPANTS = 'participants'
+
+# Шаблон рендерится один раз на рассылку, имя получателя подставляется вместо метки
+USER_NAME_PLACEHOLDER = '__notification_user_name__'
+
+
+class NotificationServiceException(Exception):
+    pass
+
+
+class UnknownKind(NotificationServiceException):
+    pass
+
+
+class UnknownAudience(NotificationServiceException):
+    pass
+
+
+class NotificationFinished(NotificationServiceException):
+    pass
+
+
+class NotificationService:
+    """
+    Массовые рассылки по конкурсам.
+
+    Получатели читаются из users пачками по возрастанию id (keyset-пагинация),
+    все письма уходят через одно SMTP-соединение процесса с ограничением
+    скорости rate писем в секунду. После каждой пачки в notifications
+    сохраняется id последнего обработанного получателя, поэтому прерванная
+    рассылка продолжается с места остановки.
+    """
+
+    def __init__(self, db, mail, rate=None, batch_size=None):
+        self.db = db
+        self.mail = mail
+        self.rate = NotificationConfig.RATE if rate is None else rate
+        self.batch_size = batch_size or NotificationConfig.BATCH_SIZE
+        self._next_send = 0.0
+
+    def create(self, kind, competition_id, audience=PARTICIPANTS):
+        """Заводит рассылку; отправка выполняется методом send"""
+        if kind not in SUBJECTS:
+            raise UnknownKind(kind)
+        if audience != PARTICIPANTS and not self.db.session.execute(
+            sa.select(Roles.id).where(Roles.title == audience)
+        ).first():
+            raise UnknownAudience(audience)
+        notification = Notifications(kind=kind, competition_id=competition_id, audience=audience)
+        self.db.session.add(notification)
+        self.db.session.commit()
+        return notification
+
+    def _recipients_query(self, notification):
+        query = (
+            sa.select(Users.id, Users.email, Users.f_name, Users.s_name)
+            .where(Users.status == 'active', Users.email_confirmed.is_(True))
+        )
+        if notification.audience == PARTICIPANTS:
+            authors = (
+                sa.select(Artworks.user_id)
+                .join(Nominations, Artworks.nomination_id == Nominations.id)
+                .where(Nominations.competition_id == notification.competition_id)
+            )
+            return query.where(Users.id.in_(authors))
+        return query.join(Roles, Users.role_id == Roles.id).where(
+            Roles.title == notification.audience
+        )
+
+    def _batches(self, notification):
+        """Пачки получателей с id больше контрольной точки"""
+        query = self._recipients_query(notification)
+        last_id = notification.last_user_id
+        while True:
+            rows = self.db.session.execute(
+                query.where(Users.id > last_id).order_by(Users.id).limit(self.batch_size)
+            ).all()
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1].id
+
+    def _render(self, notification):
+        """HTML письма без имени получателя"""
+        competition = self.db.session.get(Competitions, notification.competition_id)
+        return render_template(
+            'emails/competition_notification.html',
+            kind=notification.kind,
+            subject=SUBJECTS[notification.kind],
+            competition=competition,
+            user_name=USER_NAME_PLACEHOLDER,
+            site_url=url_for('index', _external=True)
+        )
+
+    def _throttle(self):
+        if not self.rate:
+            return
+        delay = self._next_send - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._next_send = max(self._next_send, time.monotonic()) + 1 / self.rate
+
+    def send(self, notification_id):
+        """
+        Отправляет рассылку начиная с контрольной точки; требует контекста приложения.
+        Возвращает (отправлено, с ошибкой) по всей рассылке.
+        """
+        notification = self.db.session.get(Notifications, notification_id)
+        if notification is None or notification.status == 'done':
+            raise NotificationFinished(notification_id)
+        notification.status = 'running'
+        self.db.session.commit()
+
+        subject = SUBJECTS[notification.kind]
+        html_body = self._render(notification)
+        sender = current_app.config.get('MAIL_DEFAULT_SENDER')
+        session = get_smtp_session(self.mail)
+
+        try:
+            for rows in self._batches(notification):
+                sent = failed = 0
+                for row in rows:
+                    name = f"{row.f_name} {row.s_name}"
+                    msg = Message(subject=subject, recipients=[row.email], sender=sender,
+                                  html=html_body.replace(USER_NAME_PLACEHOLDER, str(escape(name))))
+                    self._throttle()
+                    try:
+                        session.send(msg)
+                        sent += 1
+                    except smtplib.SMTPRecipientsRefused as e:
+                        # Адрес отклонен сервером - рассылка продолжается
+                        logger.warning("Рассылка %s: адрес %s отклонен: %s",
+                                       notification.id, row.email, e)
+                        failed += 1
+
+                # Контрольная точка: после сбоя будут повторены только письма текущей пачки
+                notification.last_user_id = rows[-1].id
+                notification.sent_count += sent
+                notification.failed_count += failed
+                self.db.session.commit()
+        except Exception:
+            self.db.session.rollback()
+            notification.status = 'failed'
+            self.db.session.commit()
+            raise
+
+        notification.status = 'done'
+        notification.finished_at = datetime.now(pytz.UTC)
+        self.db.session.commit()
+        logger.info("Рассылка %s завершена: отправлено %s, с ошибкой %s",
+                    notification.id, notification.sent_count, notification.failed_count)
+        return notification.sent_count, notification.failed_count
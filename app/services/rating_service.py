@@ -0,0 +1,340 @@
+from dataclasses import dataclass
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.models import Artworks, NominationRatingAggregates, RatingAggregates, Ratings
+from app.utils.advisory_lock import RATINGS_LOCK, advisory_xact_lock
+
+
+class RatingServiceException(Exception):
+    pass
+
+
+class InvalidRating(RatingServiceException):
+    pass
+
+
+# Максимальное число оценок в одном пакете
+MAX_BATCH_SIZE = 500
+
+# Колонки сводок в порядке столбцов запросов пересчета
+WORK_COLUMNS = ['work_id', 'nomination_id', 'ratings_count', 'rate_sum', 'rate_sum_squares',
+                'rate_min', 'rate_max', 'rate_mean']
+NOMINATION_COLUMNS = ['nomination_id', 'rated_works', 'ratings_count', 'rate_sum',
+                      'rate_sum_squares']
+
+
+@dataclass()
+class RatingEntry:
+    artwork_id: int
+    rating: int
+    comment: str | None = None
+
+    @classmethod
+    def from_json(cls, data):
+        """Разбирает и проверяет запись {artwork_id, rating, comment}"""
+        if not isinstance(data, dict):
+            raise InvalidRating('Неверные данные')
+        artwork_id = data.get('artwork_id')
+        rating = data.get('rating')
+        comment = data.get('comment', data.get('jury_comment'))
+
+        if not artwork_id or not rating:
+            raise InvalidRating('Неверные данные')
+        try:
+            artwork_id = int(artwork_id)
+            rating = int(rating)
+        except (TypeError, ValueError):
+            raise InvalidRating('Неверные данные')
+
+        # Проверяем диапазон оценки
+        if rating < 1 or rating > 10:
+            raise InvalidRating('Оценка должна быть от 1 до 10')
+
+        comment = (comment or '').strip() or None
+        if comment and len(comment) > 254:
+            raise InvalidRating('Комментарий не должен превышать 254 символа')
+
+        return cls(artwork_id=artwork_id, rating=rating, comment=comment)
+
+
+def _dialect_insert(db, model):
+    """INSERT с поддержкой ON CONFLICT для текущей базы"""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(model)
+    if dialect == 'sqlite':
+        return sqlite.insert(model)
+    raise RatingServiceException(f'UPSERT не поддерживается для {dialect}')
+
+
+class RatingAggregateService:
+    """
+    Сводки оценок (rating_aggregates и nomination_rating_aggregates).
+
+    Сводки меняются приращениями в той же транзакции, что и сами оценки,
+    поэтому таблица результатов номинации читается по индексу без обхода ratings.
+    После правки оценок и работ в админке сводки затронутых работ и номинаций
+    пересчитываются заново (refresh).
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def _least(self, *args):
+        if self.db.engine.dialect.name == 'sqlite':
+            return sa.func.min(*args)
+        return sa.func.least(*args)
+
+    def _greatest(self, *args):
+        if self.db.engine.dialect.name == 'sqlite':
+            return sa.func.max(*args)
+        return sa.func.greatest(*args)
+
+    def apply(self, changes):
+        """
+        Применяет изменения оценок: список (work_id, old_rate, new_rate),
+        где old_rate is None для новой оценки.
+        """
+        changes = sorted((change for change in changes if change[1] != change[2]),
+                         key=lambda change: change[0])
+        if not changes:
+            return
+
+        count_delta = {work_id: int(old is None) for work_id, old, new in changes}
+        sum_delta = {work_id: new - (old or 0) for work_id, old, new in changes}
+        squares_delta = {work_id: new * new - (old or 0) ** 2 for work_id, old, new in changes}
+        new_rates = {work_id: new for work_id, old, new in changes}
+
+        # Сводки по работам; строки блокируются в порядке work_id
+        source = sa.select(
+            Artworks.id,
+            Artworks.nomination_id,
+            sa.case(count_delta, value=Artworks.id),
+            sa.case(sum_delta, value=Artworks.id),
+            sa.case(squares_delta, value=Artworks.id),
+            sa.case(new_rates, value=Artworks.id),
+            sa.case(new_rates, value=Artworks.id),
+            sa.cast(sa.case(new_rates, value=Artworks.id), sa.Float),
+        ).where(Artworks.id.in_(new_rates)).order_by(Artworks.id)
+
+        insert = _dialect_insert(self.db, RatingAggregates).from_select(WORK_COLUMNS, source)
+        ratings_count = RatingAggregates.ratings_count + insert.excluded.ratings_count
+        rate_sum = RatingAggregates.rate_sum + insert.excluded.rate_sum
+        statement = insert.on_conflict_do_update(
+            index_elements=[RatingAggregates.work_id],
+            set_={
+                'ratings_count': ratings_count,
+                'rate_sum': rate_sum,
+                'rate_sum_squares': (RatingAggregates.rate_sum_squares
+                                     + insert.excluded.rate_sum_squares),
+                'rate_min': self._least(RatingAggregates.rate_min, insert.excluded.rate_min),
+                'rate_max': self._greatest(RatingAggregates.rate_max, insert.excluded.rate_max),
+                'rate_mean': sa.cast(rate_sum, sa.Float) / ratings_count,
+            }
+        ).returning(RatingAggregates.work_id, RatingAggregates.nomination_id,
+                    RatingAggregates.ratings_count)
+        rows = self.db.session.execute(statement).all()
+
+        # При изменении оценки прежний минимум или максимум мог уйти - пересчет по индексу
+        changed = [work_id for work_id, old, new in changes if old is not None]
+        if changed:
+            work_rates = sa.select(Ratings.rate).where(Ratings.work_id == RatingAggregates.work_id)
+            self.db.session.execute(
+                sa.update(RatingAggregates)
+                .where(RatingAggregates.work_id.in_(changed))
+                .values(
+                    rate_min=work_rates.with_only_columns(
+                        sa.func.min(Ratings.rate)).scalar_subquery(),
+                    rate_max=work_rates.with_only_columns(
+                        sa.func.max(Ratings.rate)).scalar_subquery(),
+                )
+                .execution_options(synchronize_session=False)
+            )
+
+        # Сводки по номинациям
+        rollups = {}
+        for work_id, nomination_id, total in rows:
+            rollup = rollups.setdefault(nomination_id, {
+                'nomination_id': nomination_id, 'rated_works': 0,
+                'ratings_count': 0, 'rate_sum': 0, 'rate_sum_squares': 0
+            })
+            created = count_delta[work_id]
+            rollup['rated_works'] += int(created and total == 1)
+            rollup['ratings_count'] += created
+            rollup['rate_sum'] += sum_delta[work_id]
+            rollup['rate_sum_squares'] += squares_delta[work_id]
+        if not rollups:
+            return
+
+        insert = _dialect_insert(self.db, NominationRatingAggregates).values(
+            [rollups[nomination_id] for nomination_id in sorted(rollups)]
+        )
+        self.db.session.execute(insert.on_conflict_do_update(
+            index_elements=[NominationRatingAggregates.nomination_id],
+            set_={
+                column: (getattr(NominationRatingAggregates, column)
+                         + getattr(insert.excluded, column))
+                for column in ('rated_works', 'ratings_count', 'rate_sum', 'rate_sum_squares')
+            }
+        ))
+
+    @staticmethod
+    def _per_work():
+        return sa.select(
+            Ratings.work_id,
+            Artworks.nomination_id,
+            sa.func.count(Ratings.rate),
+            sa.func.sum(Ratings.rate),
+            sa.func.sum(Ratings.rate * Ratings.rate),
+            sa.func.min(Ratings.rate),
+            sa.func.max(Ratings.rate),
+            sa.func.avg(sa.cast(Ratings.rate, sa.Float)),
+        ).join(Artworks, Ratings.work_id == Artworks.id).where(
+            Ratings.rate.isnot(None)
+        ).group_by(Ratings.work_id, Artworks.nomination_id)
+
+    @staticmethod
+    def _per_nomination():
+        return sa.select(
+            RatingAggregates.nomination_id,
+            sa.func.count(),
+            sa.func.sum(RatingAggregates.ratings_count),
+            sa.func.sum(RatingAggregates.rate_sum),
+            sa.func.sum(RatingAggregates.rate_sum_squares),
+        ).group_by(RatingAggregates.nomination_id)
+
+    def rebuild(self):
+        """Пересчитывает все сводки по таблице ratings; возвращает число работ со сводкой"""
+        self.db.session.execute(sa.delete(NominationRatingAggregates))
+        self.db.session.execute(sa.delete(RatingAggregates))
+        result = self.db.session.execute(
+            sa.insert(RatingAggregates).from_select(WORK_COLUMNS, self._per_work())
+        )
+        self.db.session.execute(sa.insert(NominationRatingAggregates).from_select(
+            NOMINATION_COLUMNS, self._per_nomination()
+        ))
+        return result.rowcount
+
+    def refresh(self, work_ids=(), nomination_ids=()):
+        """
+        Пересчитывает по ratings сводки работ work_ids и их номинаций (прежней и
+        текущей), а также номинаций nomination_ids. Нужен после правок в обход
+        RatingService: изменения и удаления оценок, переноса или удаления работы.
+        Транзакцию фиксирует вызывающий код.
+        """
+        work_ids = sorted(set(work_ids))
+        nomination_ids = set(nomination_ids)
+        if work_ids:
+            nomination_ids.update(self.db.session.execute(
+                sa.select(RatingAggregates.nomination_id)
+                .where(RatingAggregates.work_id.in_(work_ids))
+            ).scalars())
+            nomination_ids.update(self.db.session.execute(
+                sa.select(Artworks.nomination_id).where(Artworks.id.in_(work_ids))
+            ).scalars())
+            self.db.session.execute(
+                sa.delete(RatingAggregates).where(RatingAggregates.work_id.in_(work_ids))
+            )
+            self.db.session.execute(sa.insert(RatingAggregates).from_select(
+                WORK_COLUMNS, self._per_work().where(Ratings.work_id.in_(work_ids))
+            ))
+
+        nomination_ids = sorted(n for n in nomination_ids if n is not None)
+        if nomination_ids:
+            self.db.session.execute(
+                sa.delete(NominationRatingAggregates)
+                .where(NominationRatingAggregates.nomination_id.in_(nomination_ids))
+            )
+            self.db.session.execute(sa.insert(NominationRatingAggregates).from_select(
+                NOMINATION_COLUMNS,
+                self._per_nomination().where(RatingAggregates.nomination_id.in_(nomination_ids))
+            ))
+
+    def standings(self, nomination_id, limit=None):
+        """
+        Работы номинации по убыванию средней оценки -
+        чтение по индексу (nomination_id, rate_mean)
+        """
+        query = sa.select(RatingAggregates).where(
+            RatingAggregates.nomination_id == nomination_id
+        ).order_by(
+            RatingAggregates.rate_mean.desc(),
+            RatingAggregates.ratings_count.desc(),
+            RatingAggregates.work_id
+        )
+        if limit:
+            query = query.limit(limit)
+        return self.db.session.execute(query).scalars().all()
+
+    def summary(self, nomination_id):
+        """Сводка по номинации или None, если оценок еще нет"""
+        return self.db.session.get(NominationRatingAggregates, nomination_id)
+
+
+class RatingService:
+    """
+    Запись оценок жюри одним оператором INSERT ... SELECT ... ON CONFLICT DO UPDATE.
+
+    Работы проверяются в том же запросе (SELECT из artworks), а число запросов
+    не зависит от размера пакета: блокировка члена жюри (только PostgreSQL),
+    чтение прежних оценок, запись оценок, сводки по работам, пересчет
+    минимума и максимума (если оценки изменены) и сводки по номинациям -
+    от 4 до 6 запросов на сохранение.
+    Пустой комментарий не затирает ранее сохраненный.
+    Сводки оценок обновляются в той же транзакции; блокировка члена жюри
+    нужна, чтобы параллельные первые оценки одной работы не были обе учтены
+    в сводке как новые.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.aggregates = RatingAggregateService(db)
+
+    def upsert(self, jury_id, entries):
+        """
+        Сохраняет оценки и возвращает множество id работ, для которых оценка записана.
+        Работы, которых нет, пропускаются. Транзакцию фиксирует вызывающий код.
+        """
+        # При повторе работы в пакете действует последняя запись
+        entries = list({entry.artwork_id: entry for entry in entries}.values())
+        if not entries:
+            return set()
+
+        rates = {entry.artwork_id: entry.rating for entry in entries}
+        comments = {entry.artwork_id: entry.comment for entry in entries if entry.comment}
+
+        source = sa.select(
+            Artworks.id,
+            sa.literal(jury_id, sa.Integer),
+            sa.case(rates, value=Artworks.id),
+            sa.case(comments, value=Artworks.id, else_=sa.null()) if comments else sa.null(),
+        ).where(Artworks.id.in_(rates))
+
+        # Прежние оценки нужны для приращений сводок. SELECT ... FOR UPDATE не блокирует
+        # еще не существующие строки, поэтому до чтения берется блокировка члена жюри
+        advisory_xact_lock(self.db.session, RATINGS_LOCK, jury_id)
+        previous = dict(self.db.session.execute(
+            sa.select(Ratings.work_id, Ratings.rate)
+            .where(Ratings.jury_id == jury_id, Ratings.work_id.in_(rates))
+            .with_for_update()
+        ).all())
+
+        insert = _dialect_insert(self.db, Ratings).from_select(
+            ['work_id', 'jury_id', 'rate', 'jury_comment'], source
+        )
+        statement = insert.on_conflict_do_update(
+            index_elements=[Ratings.work_id, Ratings.jury_id],
+            set_={
+                'rate': insert.excluded.rate,
+                'jury_comment': sa.func.coalesce(insert.excluded.jury_comment,
+                                                 Ratings.jury_comment),
+            }
+        ).returning(Ratings.work_id)
+
+        saved = set(self.db.session.execute(statement).scalars())
+        self.aggregates.apply([
+            (work_id, previous.get(work_id), rates[work_id]) for work_id in saved
+        ])
+        return saved
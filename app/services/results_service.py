@@ -0,0 +1,144 @@
+from dataclasses import dataclass
+
+import numpy as np
+import sqlalchemy as sa
+
+from app.models import Artworks, Nominations, Ratings
+
+
+class ResultsServiceException(Exception):
+    pass
+
+
+class NoRatings(ResultsServiceException):
+    pass
+
+
+@dataclass()
+class Scores:
+    """Итоги по работам; все массивы выровнены по work_ids"""
+    work_ids: np.ndarray
+    nomination_ids: np.ndarray
+    count: np.ndarray
+    mean: np.ndarray
+    trimmed_mean: np.ndarray
+    z_mean: np.ndarray
+
+    def winners(self, min_ratings=1):
+        """
+        Победитель каждой номинации: {nomination_id: work_id}.
+
+        Порядок сравнения: средняя нормированная оценка (z), усеченное среднее,
+        обычное среднее, число оценок; при полном равенстве - более ранняя работа.
+        """
+        eligible = self.count >= min_ratings
+        if not eligible.any():
+            return {}
+        work_ids = self.work_ids[eligible]
+        nomination_ids = self.nomination_ids[eligible]
+        # lexsort сортирует по последнему ключу в первую очередь
+        order = np.lexsort((
+            work_ids,
+            -self.count[eligible],
+            -self.mean[eligible],
+            -self.trimmed_mean[eligible],
+            -self.z_mean[eligible],
+            nomination_ids,
+        ))
+        nominations, first = np.unique(nomination_ids[order], return_index=True)
+        return dict(zip(nominations.tolist(), work_ids[order][first].tolist()))
+
+
+def compute_scores(work_ids, jury_ids, rates, nomination_ids, trim=0.1):
+    """
+    Векторный подсчет итогов по массивам оценок (по одной строке на оценку).
+
+    trim - доля оценок, отбрасываемых с каждого края при усеченном среднем.
+    Оценки нормируются по каждому члену жюри (z-score), чтобы строгие и
+    щедрые судьи влияли на результат одинаково.
+    """
+    work_ids = np.asarray(work_ids, dtype=np.int64)
+    jury_ids = np.asarray(jury_ids, dtype=np.int64)
+    rates = np.asarray(rates, dtype=np.float64)
+    nomination_ids = np.asarray(nomination_ids, dtype=np.int64)
+    if rates.size == 0:
+        raise NoRatings()
+
+    works, work_index = np.unique(work_ids, return_inverse=True)
+    _, jury_index = np.unique(jury_ids, return_inverse=True)
+
+    # Среднее по работе
+    count = np.bincount(work_index)
+    mean = np.bincount(work_index, weights=rates) / count
+
+    # Нормировка по члену жюри
+    jury_count = np.bincount(jury_index)
+    jury_mean = np.bincount(jury_index, weights=rates) / jury_count
+    jury_var = np.bincount(jury_index, weights=rates * rates) / jury_count - jury_mean ** 2
+    jury_std = np.sqrt(np.clip(jury_var, 0, None))
+    deviation = rates - jury_mean[jury_index]
+    z = np.divide(deviation, jury_std[jury_index], out=np.zeros_like(rates),
+                  where=jury_std[jury_index] > 1e-9)
+    z_mean = np.bincount(work_index, weights=z) / count
+
+    # Усеченное среднее: сортируем оценки внутри работы и отбрасываем края
+    order = np.lexsort((rates, work_index))
+    cumulative = np.concatenate(([0.0], np.cumsum(rates[order])))
+    start = np.concatenate(([0], np.cumsum(count)[:-1]))
+    cut = np.floor(count * trim).astype(np.int64)
+    trimmed_mean = (cumulative[start + count - cut] - cumulative[start + cut]) / (count - 2 * cut)
+
+    # Номинация работы - из первой ее оценки
+    first_rating = np.zeros(works.size, dtype=np.int64)
+    first_rating[work_index[::-1]] = np.arange(work_index.size)[::-1]
+
+    return Scores(
+        work_ids=works,
+        nomination_ids=nomination_ids[first_rating],
+        count=count,
+        mean=mean,
+        trimmed_mean=trimmed_mean,
+        z_mean=z_mean,
+    )
+
+
+class ResultsService:
+    """Подсчет итогов конкурса и запись победителей номинаций"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def load_ratings(self, competition_id):
+        """Все оценки активных работ конкурса одним запросом, в виде массивов NumPy"""
+        rows = self.db.session.execute(
+            sa.select(Ratings.work_id, Ratings.jury_id, Ratings.rate, Artworks.nomination_id)
+            .join(Artworks, Ratings.work_id == Artworks.id)
+            .join(Nominations, Artworks.nomination_id == Nominations.id)
+            .where(
+                Nominations.competition_id == competition_id,
+                Artworks.status == 'active',
+                Ratings.rate.isnot(None)
+            )
+        ).all()
+        data = np.array(rows, dtype=np.int64).reshape(-1, 4)
+        return data[:, 0], data[:, 1], data[:, 2], data[:, 3]
+
+    def compute(self, competition_id, trim=0.1):
+        return compute_scores(*self.load_ratings(competition_id), trim=trim)
+
+    def save_winners(self, winners):
+        """Записывает победителей всех номинаций одним пакетным UPDATE"""
+        if winners:
+            self.db.session.execute(
+                sa.update(Nominations),
+                [{'id': nomination_id, 'winner_work_id': work_id}
+                 for nomination_id, work_id in winners.items()]
+            )
+        self.db.session.commit()
+
+    def run(self, competition_id, trim=0.1, min_ratings=1, dry_run=False):
+        """Считает итоги конкурса и, если не dry_run, сохраняет победителей"""
+        winners = self.compute(competition_id, trim=trim).winners(min_ratings=min_ratings)
+        if not dry_run:
+            self.save_winners(winners)
+        return winners
@@ -0,0 +1,202 @@
+import json
+import math
+import secrets
+import time
+from dataclasses import dataclass, asdict
+
+from app.utils.config import MinIOConfig
+from app.utils.image_validation import (
+    HEADER_SIZE, ImageMetadata, ImageValidationError, inspect_image
+)
+
+
+class UploadServiceException(Exception):
+    pass
+
+
+class UploadNotFound(UploadServiceException):
+    pass
+
+
+class InvalidChunk(UploadServiceException):
+    pass
+
+
+class UploadIncomplete(UploadServiceException):
+    pass
+
+
+@dataclass()
+class ResumableUpload:
+    token: str
+    user_id: int
+    competition_id: int
+    nomination_id: int
+    s3_key: str
+    upload_id: str
+    content_type: str
+    size: int
+    chunk_size: int
+    part_count: int
+    description: str
+
+
+class ResumableUploadService:
+    """
+    Возобновляемая загрузка файла частями.
+
+    Каждая часть сразу отправляется в MinIO как часть multipart-загрузки,
+    а состояние (upload_id и etag полученных частей) хранится в Redis.
+    Клиент может в любой момент узнать, каких частей не хватает, и
+    дослать только их.
+
+    Состояние в Redis истекает через TTL, а части брошенной загрузки остаются
+    в хранилище. Поэтому загрузки дополнительно записываются в сортированное
+    множество по времени истечения, и abort_expired отменяет истекшие
+    (flask uploads cleanup).
+    """
+
+    KEY_PREFIX = 'resumable_upload'
+    # Сортированное множество загрузок по времени истечения их состояния
+    EXPIRY_KEY = f'{KEY_PREFIX}:expiry'
+    # Сколько живет незавершенная загрузка
+    TTL = 24 * 3600
+
+    def __init__(self, redis, storage, chunk_size=MinIOConfig.PART_SIZE):
+        self.redis = redis
+        self.storage = storage
+        self.chunk_size = chunk_size
+
+    def _key(self, token):
+        return f"{self.KEY_PREFIX}:{token}"
+
+    def _parts_key(self, token):
+        return f"{self.KEY_PREFIX}:{token}:parts"
+
+    @staticmethod
+    def _expiry_member(upload):
+        """Все, что нужно для отмены загрузки после того, как ее состояние истекло"""
+        return json.dumps([upload.token, upload.s3_key, upload.upload_id])
+
+    def start(self, user_id, competition_id, nomination_id, s3_key, content_type, size,
+              description):
+        upload_id = self.storage.create_multipart_upload(s3_key, content_type)
+        upload = ResumableUpload(
+            token=secrets.token_urlsafe(24),
+            user_id=user_id,
+            competition_id=competition_id,
+            nomination_id=nomination_id,
+            s3_key=s3_key,
+            upload_id=upload_id,
+            content_type=content_type,
+            size=size,
+            chunk_size=self.chunk_size,
+            part_count=max(1, math.ceil(size / self.chunk_size)),
+            description=description
+        )
+        key = self._key(upload.token)
+        pipe = self.redis.pipeline()
+        pipe.hset(key, mapping={k: str(v) for k, v in asdict(upload).items()})
+        pipe.expire(key, self.TTL)
+        pipe.zadd(self.EXPIRY_KEY, {self._expiry_member(upload): time.time() + self.TTL})
+        pipe.execute()
+        return upload
+
+    def get(self, token, user_id):
+        data = self.redis.hgetall(self._key(token))
+        if not data:
+            raise UploadNotFound()
+        data = {k.decode(): v.decode() for k, v in data.items()}
+        upload = ResumableUpload(
+            token=data['token'],
+            user_id=int(data['user_id']),
+            competition_id=int(data['competition_id']),
+            nomination_id=int(data['nomination_id']),
+            s3_key=data['s3_key'],
+            upload_id=data['upload_id'],
+            content_type=data['content_type'],
+            size=int(data['size']),
+            chunk_size=int(data['chunk_size']),
+            part_count=int(data['part_count']),
+            description=data['description']
+        )
+        if upload.user_id != user_id:
+            raise UploadNotFound()
+        return upload
+
+    def expected_part_size(self, upload, part_number):
+        if part_number < upload.part_count:
+            return upload.chunk_size
+        return upload.size - upload.chunk_size * (upload.part_count - 1)
+
+    def put_part(self, upload, part_number, data):
+        if not 1 <= part_number <= upload.part_count:
+            raise InvalidChunk('Неверный номер части')
+        if len(data) != self.expected_part_size(upload, part_number):
+            raise InvalidChunk('Неверный размер части')
+
+        # Первая часть содержит заголовок файла: проверяем его до записи в хранилище
+        metadata = None
+        if part_number == 1:
+            try:
+                metadata = inspect_image(data[:HEADER_SIZE])
+            except ImageValidationError as e:
+                raise InvalidChunk(str(e))
+            if metadata.content_type != upload.content_type:
+                raise InvalidChunk('Тип файла не совпадает с заявленным')
+
+        etag = self.storage.upload_part(upload.s3_key, upload.upload_id, part_number, data)
+
+        pipe = self.redis.pipeline()
+        if metadata:
+            pipe.hset(self._key(upload.token), 'metadata', json.dumps(metadata.to_dict()))
+        pipe.hset(self._parts_key(upload.token), part_number, etag)
+        pipe.expire(self._parts_key(upload.token), self.TTL)
+        pipe.expire(self._key(upload.token), self.TTL)
+        pipe.zadd(self.EXPIRY_KEY, {self._expiry_member(upload): time.time() + self.TTL})
+        pipe.execute()
+
+    def received_parts(self, upload):
+        parts = self.redis.hgetall(self._parts_key(upload.token))
+        return {int(number): etag.decode() for number, etag in parts.items()}
+
+    def metadata(self, upload):
+        """Метаданные изображения, извлеченные из первой части"""
+        raw = self.redis.hget(self._key(upload.token), 'metadata')
+        return ImageMetadata.from_dict(json.loads(raw)) if raw else None
+
+    def missing_parts(self, upload):
+        received = self.received_parts(upload)
+        return [n for n in range(1, upload.part_count + 1) if n not in received]
+
+    def complete(self, upload):
+        received = self.received_parts(upload)
+        if len(received) < upload.part_count:
+            raise UploadIncomplete()
+        self.storage.complete_multipart_upload(upload.s3_key, upload.upload_id,
+                                               list(received.items()))
+        self._forget(upload)
+
+    def abort(self, upload):
+        self.storage.abort_multipart_upload(upload.s3_key, upload.upload_id)
+        self._forget(upload)
+
+    def abort_expired(self, now=None):
+        """Отменяет в хранилище загрузки, состояние которых истекло; возвращает их число"""
+        now = time.time() if now is None else now
+        aborted = 0
+        for member in self.redis.zrangebyscore(self.EXPIRY_KEY, 0, now):
+            token, s3_key, upload_id = json.loads(member)
+            # Часы приложения и Redis могут расходиться: живую загрузку не трогаем
+            if self.redis.exists(self._key(token)):
+                continue
+            self.storage.abort_multipart_upload(s3_key, upload_id)
+            self.redis.zrem(self.EXPIRY_KEY, member)
+            aborted += 1
+        return aborted
+
+    def _forget(self, upload):
+        pipe = self.redis.pipeline()
+        pipe.delete(self._key(upload.token), self._parts_key(upload.token))
+        pipe.zrem(self.EXPIRY_KEY, self._expiry_member(upload))
+        pipe.execute()
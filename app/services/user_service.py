@@ -24,6 +24,7 @@ class NewUser:
     about: str
     password_hash: str | None=None
     verification_token: str | None=None
+    id: int | None = None
 
 class UserService:
     def __init__(self, db):
@@ -49,6 +50,7 @@ class UserService:
         try:
             self.db.session.add(new_user)
             self.db.session.commit()
+            user.id = new_user.id
             return user
         except Exception:
             self.db.session.rollback()
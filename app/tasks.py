@@ -1,6 +1,13 @@
+import hashlib
+
 from flask import url_for, render_template
 from flask_mail import Message
-from app import create_app, mail
+from app import mail
+from app.utils.mailer import get_smtp_session
+from app.worker import get_app
+from logger_setup import setup_logger
+
+logger = setup_logger('tasks')
 
 
 def send_email(subject, recipients, text_body=None, html_body=None, sender=None):
@@ -11,8 +18,8 @@ def send_email(subject, recipients, text_body=None, html_body=None, sender=None)
     if isinstance(recipients, str):
         recipients = [recipients]
 
-    # Создаем Flask приложение
-    app = create_app()
+    # Приложение создается один раз на процесс воркера
+    app = get_app()
 
     # Работаем в контексте приложения
     with app.app_context():
@@ -28,16 +35,15 @@ def send_email(subject, recipients, text_body=None, html_body=None, sender=None)
         if html_body:
             msg.html = html_body
 
-        # Отправляем через Flask-Mail
-        mail.send(msg)
+        # Отправляем через постоянное SMTP-соединение процесса
+        get_smtp_session(mail).send(msg)
 
         return True, "Email sent successfully"
 
 
 def send_verification_email(user_email, user_name, verification_token):
     """Отправка письма для подтверждения email"""
-    # Создаем Flask приложение
-    app = create_app()
+    app = get_app()
 
     with app.app_context():
         subject = "Подтверждение email - Фотоконкурс"
@@ -64,7 +70,7 @@ def send_verification_email(user_email, user_name, verification_token):
 
 def send_password_reset_email(user_email, reset_token):
     """Отправка письма для сброса пароля"""
-    app = create_app()
+    app = get_app()
 
     with app.app_context():
         subject = "Восстановление пароля - Фотоконкурс"
@@ -83,4 +89,195 @@ def send_password_reset_email(user_email, reset_token):
         html_body = render_template('emails/password_reset.html',
                                     reset_link=reset_link)
 
-        return send_email(subject, user_email, text_body, html_body)
\ No newline at end of file
+        return send_email(subject, user_email, text_body, html_body)
+
+
+def send_user_email(kind, user_id):
+    """
+    Служебное письмо пользователю по id: адрес и токен читаются при выполнении,
+    поэтому задача, дождавшаяся своей очереди, отправляет актуальные данные
+    """
+    from app.extensions import db
+    from app.models import Users
+
+    app = get_app()
+
+    with app.app_context():
+        user = db.session.get(Users, user_id)
+        if user is None:
+            logger.warning("Письмо %s не отправлено: пользователь %s не найден", kind, user_id)
+            return False, "User not found"
+
+        if kind == 'verification':
+            if not user.verification_token:
+                # Email уже подтвержден, пока задача ждала в очереди
+                return False, "Email already verified"
+            return send_verification_email(user.email, user.f_name, user.verification_token)
+        if kind == 'password_reset':
+            if not user.reset_password_token:
+                return False, "Password already reset"
+            return send_password_reset_email(user.email, user.reset_password_token)
+        raise ValueError(f"Неизвестный вид письма: {kind}")
+
+
+def send_artwork_rejected_email(artwork_id, reason):
+    """Письмо автору о том, что загруженная работа не принята"""
+    from app.extensions import db
+    from app.models import Artworks
+
+    app = get_app()
+
+    with app.app_context():
+        artwork = db.session.get(Artworks, artwork_id)
+        if artwork is None or artwork.status != 'rejected':
+            return False, "Artwork is not rejected"
+
+        html_body = render_template(
+            'emails/artwork_rejected.html',
+            user_name=artwork.author.f_name,
+            file_name=artwork.file_name,
+            nomination=artwork.nomination.title,
+            reason=reason,
+            site_url=url_for('index', _external=True)
+        )
+        return send_email("Работа не принята - Фотоконкурс", artwork.author.email,
+                          html_body=html_body)
+
+
+def _reject_artwork(db, storage, artwork, reason):
+    """
+    Отклонение работы, проверенной уже после загрузки: объект удаляется из
+    хранилища, автору уходит письмо с причиной
+    """
+    from app.services.dedup_service import DedupService
+    from app.utils.email_queue import EmailQueue
+
+    DedupService(db, storage).discard(artwork.s3_key)
+    artwork.status = 'rejected'
+    artwork.s3_key = None
+    artwork.file = None
+    db.session.commit()
+    EmailQueue().send_artwork_rejected(artwork.id, reason)
+
+
+# Причина отклонения повторной подачи, которую сообщают автору
+DUPLICATE_REJECTION = 'Эта фотография уже подана в выбранную номинацию'
+
+
+def generate_artwork_derivatives(artwork_id):
+    """Построение миниатюры и уменьшенных копий работы для страниц голосования"""
+    from app.extensions import db
+    from app.models import Artworks
+    from app.services.dedup_service import DedupService, DuplicateSubmission
+    from app.utils.image_validation import inspect_image, ImageValidationError
+    from app.utils.image_derivatives import build_derivatives
+    from app.utils.minio_service import get_storage, derivative_key
+
+    app = get_app()
+
+    with app.app_context():
+        artwork = db.session.get(Artworks, artwork_id)
+        if artwork is None or not artwork.s3_key:
+            return False
+
+        storage = get_storage()
+        original = storage.read_object(artwork.s3_key)
+
+        # Для файлов, загруженных в обход сервера, метаданные извлекаются здесь
+        if artwork.width is None:
+            try:
+                artwork.set_image_metadata(inspect_image(original))
+            except ImageValidationError as e:
+                logger.error("Работа %s не является корректным изображением: %s", artwork_id, e)
+                _reject_artwork(db, storage, artwork, str(e))
+                return False
+
+        # Файлы, загруженные в обход сервера, дедуплицируются здесь
+        if artwork.content_hash is None:
+            dedup_service = DedupService(db, storage)
+            artwork.content_hash = hashlib.sha256(original).hexdigest()
+            try:
+                dedup_service.check_nomination(artwork.content_hash, artwork.nomination_id,
+                                               exclude_id=artwork.id)
+            except DuplicateSubmission:
+                logger.error("Работа %s повторяет уже поданную в номинацию %s",
+                             artwork_id, artwork.nomination_id)
+                _reject_artwork(db, storage, artwork, DUPLICATE_REJECTION)
+                return False
+            s3_key = dedup_service.resolve(artwork.content_hash, artwork.s3_key, len(original))
+            if s3_key != artwork.s3_key:
+                artwork.s3_key = s3_key
+                artwork.file = storage.public_url(s3_key)
+                artwork.derivatives = DedupService.existing_derivatives(s3_key)
+            db.session.commit()
+            if artwork.derivatives:
+                return True
+
+        derivatives = {}
+        for width, extension, content_type, data in build_derivatives(original):
+            key = derivative_key(artwork.s3_key, width, extension)
+            upload_res = storage.upload_image(file_data=data, filename=key,
+                                              content_type=content_type)
+            if not upload_res.get('success'):
+                raise RuntimeError(upload_res.get('error'))
+            derivatives.setdefault(extension, {})[str(width)] = key
+
+        artwork.derivatives = derivatives
+        db.session.commit()
+        return True
+
+
+def compute_competition_results(competition_id, trim=0.1, min_ratings=1):
+    """Подсчет итогов конкурса и запись победителей номинаций"""
+    from app.extensions import db
+    from app.services.results_service import ResultsService, NoRatings
+
+    app = get_app()
+
+    with app.app_context():
+        try:
+            winners = ResultsService(db).run(competition_id, trim=trim, min_ratings=min_ratings)
+        except NoRatings:
+            logger.warning("Для конкурса %s нет оценок, итоги не подведены", competition_id)
+            return {}
+        logger.info("Итоги конкурса %s: %s", competition_id, winners)
+        return winners
+
+
+# Задача назначений одна на все конкурсы: повторные постановки сливаются в одну
+JURY_ASSIGNMENTS_JOB_ID = 'jury-assignments'
+
+
+def update_jury_assignments(competition_id=None):
+    """Добор назначений жюри для новых работ и перенос лишних от перегруженных членов жюри"""
+    from app.extensions import db
+    from app.services.assignment_service import AssignmentService, NoJurors
+
+    app = get_app()
+
+    with app.app_context():
+        assignment_service = AssignmentService(db)
+        try:
+            created = assignment_service.schedule(competition_id)
+            moved = assignment_service.rebalance()
+        except NoJurors:
+            logger.warning("Нет активных членов жюри, назначения не построены")
+            return 0, 0
+        db.session.commit()
+        logger.info("Назначения жюри: создано %s, перенесено %s", created, moved)
+        return created, moved
+
+
+def send_bulk_notification(notification_id):
+    """Массовая рассылка по конкурсу; при повторном запуске продолжается с контрольной точки"""
+    from app.extensions import db
+    from app.services.notification_service import NotificationService, NotificationFinished
+
+    app = get_app()
+
+    with app.app_context():
+        try:
+            return NotificationService(db, mail).send(notification_id)
+        except NotificationFinished:
+            logger.warning("Рассылка %s не найдена или уже завершена", notification_id)
+            return 0, 0
@@ -0,0 +1,18 @@
+import sqlalchemy as sa
+
+# Пространства ключей блокировок (первый ключ пары pg_advisory_xact_lock)
+RATINGS_LOCK = 1
+JURY_ASSIGNMENTS_LOCK = 2
+
+
+def advisory_xact_lock(session, namespace, key=0):
+    """
+    Блокировка PostgreSQL до конца текущей транзакции по паре (namespace, key).
+
+    В SQLite записи и так выполняются по одной: второй пишущий получает
+    ошибку "database is locked", а не устаревшие данные, поэтому там
+    блокировка не нужна.
+    """
+    if session.get_bind().dialect.name != 'postgresql':
+        return
+    session.execute(sa.select(sa.func.pg_advisory_xact_lock(namespace, key)))
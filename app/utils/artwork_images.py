@@ -0,0 +1,41 @@
+from app.utils.image_derivatives import THUMBNAIL_WIDTH
+from app.utils.url_resolver import resolve_url
+
+
+def _derivative_urls(artwork, extension):
+    """Возвращает список (ширина, URL) уменьшенных копий работы по возрастанию ширины"""
+    keys = (artwork.derivatives or {}).get(extension) or {}
+    return [(int(width), resolve_url(key))
+            for width, key in sorted(keys.items(), key=lambda item: int(item[0]))]
+
+
+def artwork_url(artwork):
+    """URL оригинала работы, подписанный по Artworks.s3_key"""
+    if artwork.s3_key:
+        return resolve_url(artwork.s3_key)
+    return artwork.file
+
+
+def artwork_src(artwork, width=THUMBNAIL_WIDTH, extension='jpg'):
+    """
+    URL самой маленькой копии не уже width.
+    Пока копии не построены, возвращает оригинал.
+    """
+    urls = _derivative_urls(artwork, extension)
+    if not urls:
+        return artwork_url(artwork)
+    for derivative_width, url in urls:
+        if derivative_width >= width:
+            return url
+    return urls[-1][1]
+
+
+def artwork_srcset(artwork, extension='jpg'):
+    """Значение атрибута srcset по всем копиям работы"""
+    return ', '.join(f"{url} {width}w" for width, url in _derivative_urls(artwork, extension))
+
+
+def register_template_filters(app):
+    app.add_template_filter(artwork_url)
+    app.add_template_filter(artwork_src)
+    app.add_template_filter(artwork_srcset)
@@ -0,0 +1,121 @@
+import json
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+
+from sqlalchemy.orm import selectinload
+
+from app.models import Competitions
+from app.utils.config import CacheConfig
+from app.utils.redis_cache import RedisCache
+
+
+def _parse_datetime(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def _format_datetime(value):
+    return value.isoformat() if value else None
+
+
+@dataclass()
+class NominationCard:
+    id: int
+    title: str
+    status: str
+
+
+@dataclass()
+class CompetitionCard:
+    """Конкурс для главной страницы, не привязанный к сессии SQLAlchemy"""
+    id: int
+    title: str
+    status: str
+    start_of_accepting: datetime | None
+    end_of_accepting: datetime | None
+    summing_up: datetime | None
+    nominations: list = field(default_factory=list)
+
+    @classmethod
+    def from_model(cls, competition):
+        return cls(
+            id=competition.id,
+            title=competition.title,
+            status=competition.status,
+            start_of_accepting=competition.start_of_accepting,
+            end_of_accepting=competition.end_of_accepting,
+            summing_up=competition.summing_up,
+            nominations=[
+                NominationCard(id=nomination.id, title=nomination.title, status=nomination.status)
+                for nomination in sorted(competition.nominations, key=lambda item: item.id)
+            ]
+        )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'title': self.title,
+            'status': self.status,
+            'start_of_accepting': _format_datetime(self.start_of_accepting),
+            'end_of_accepting': _format_datetime(self.end_of_accepting),
+            'summing_up': _format_datetime(self.summing_up),
+            'nominations': [asdict(nomination) for nomination in self.nominations],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            id=data['id'],
+            title=data['title'],
+            status=data['status'],
+            start_of_accepting=_parse_datetime(data['start_of_accepting']),
+            end_of_accepting=_parse_datetime(data['end_of_accepting']),
+            summing_up=_parse_datetime(data['summing_up']),
+            nominations=[NominationCard(**nomination) for nomination in data['nominations']]
+        )
+
+
+class CompetitionsCache(RedisCache):
+    """
+    Конкурсы с открытым приемом работ для главной страницы.
+
+    Список строится одним запросом с selectinload номинаций и хранится в Redis
+    до ближайшего окончания приема работ (но не дольше ttl); правки конкурсов
+    и номинаций в админке сбрасывают его сразу.
+    """
+
+    KEY = 'open'
+
+    def __init__(self, ttl, prefix='index:competitions:'):
+        super().__init__(prefix)
+        self.ttl = ttl
+
+    @staticmethod
+    def _query(now):
+        competitions = (
+            Competitions.query
+            .options(selectinload(Competitions.nominations))
+            .filter(Competitions.end_of_accepting > now)
+            .order_by(Competitions.end_of_accepting, Competitions.id)
+            .all()
+        )
+        return [CompetitionCard.from_model(competition) for competition in competitions]
+
+    def open_competitions(self):
+        now = datetime.now()
+        cached = self.get(self.KEY)
+        if cached is not None:
+            cards = [CompetitionCard.from_dict(data) for data in json.loads(cached)]
+        else:
+            cards = self._query(now)
+            # Список устаревает, как только у первого конкурса закрывается прием работ
+            ttl = self.ttl
+            if cards:
+                ttl = min(ttl, (cards[0].end_of_accepting - now).total_seconds())
+            self.set(self.KEY, json.dumps([card.to_dict() for card in cards]), ttl)
+        return [card for card in cards if card.end_of_accepting > now]
+
+    def invalidate(self):
+        self.delete(self.KEY)
+
+
+competitions_cache = CompetitionsCache(CacheConfig.INDEX_TTL)
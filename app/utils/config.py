@@ -1,14 +1,67 @@
 import os
+
+import certifi
+import urllib3
 from minio import Minio
 from minio.error import S3Error
 
 
+class StorageConfig:
+    # Бэкенд хранилища работ: minio или local
+    BACKEND = os.getenv('STORAGE_BACKEND', 'minio')
+
+
+class LocalStorageConfig:
+    # Каталог для файлов и ключ подписи URL локального хранилища
+    ROOT = os.getenv('LOCAL_STORAGE_ROOT', 'storage')
+    SIGNING_KEY = os.getenv('LOCAL_STORAGE_SIGNING_KEY') or os.getenv('SECRET_KEY') or ''
+    # Префикс маршрута Flask, который отдает файлы по подписанным URL
+    URL_PREFIX = '/storage'
+
+
+class CacheConfig:
+    # Время жизни кэша таблицы roles в памяти процесса, секунды
+    ROLES_TTL = int(os.getenv('ROLES_CACHE_TTL', 300))
+    # Время жизни снимка пользователя в Redis, секунды
+    USER_TTL = int(os.getenv('USER_CACHE_TTL', 60))
+    # Наибольшее время жизни списка конкурсов главной страницы в Redis, секунды
+    INDEX_TTL = int(os.getenv('INDEX_CACHE_TTL', 600))
+
+
+class JuryConfig:
+    # Лента голосования по назначениям вместо всех активных работ
+    ASSIGNMENTS = os.getenv('JURY_ASSIGNMENTS', 'false').lower() in ('1', 'true', 'yes')
+    # Сколько независимых оценок должна получить каждая работа
+    RATINGS_PER_WORK = int(os.getenv('JURY_RATINGS_PER_WORK', 3))
+
+
+class NotificationConfig:
+    # Предел скорости массовой рассылки, писем в секунду (0 - без ограничения)
+    RATE = float(os.getenv('NOTIFICATIONS_RATE', 5))
+    # Получателей в одной пачке; после каждой пачки сохраняется контрольная точка
+    BATCH_SIZE = int(os.getenv('NOTIFICATIONS_BATCH_SIZE', 100))
+
+
+class MailQueueConfig:
+    # Очередь служебных писем (подтверждение email, сброс пароля) и очередь рассылок;
+    # воркер должен слушать их в порядке приоритета: rq worker mail-high default mail-low
+    HIGH_QUEUE = os.getenv('MAIL_HIGH_QUEUE', 'mail-high')
+    LOW_QUEUE = os.getenv('MAIL_LOW_QUEUE', 'mail-low')
+    # Повторы отправки с экспоненциальной задержкой BACKOFF, 2*BACKOFF, 4*BACKOFF... секунд
+    RETRIES = int(os.getenv('MAIL_RETRIES', 4))
+    BACKOFF = int(os.getenv('MAIL_RETRY_BACKOFF', 15))
+    # Сколько секунд после отправки повторный запрос того же письма не порождает новую задачу
+    RESEND_COOLDOWN = int(os.getenv('MAIL_RESEND_COOLDOWN', 60))
+
+
 class MinIOConfig:
     # Настройки подключения
     ENDPOINT = os.getenv('ENDPOINT')
     ACCESS_KEY = os.getenv('ACCESS_KEY')
     SECRET_KEY = os.getenv('SECRET_KEY')
     SECURE = False
+    # Регион задается явно, чтобы подпись URL не требовала запроса к MinIO
+    REGION = os.getenv('MINIO_REGION', 'us-east-1')
 
     # Имя бакета
     BUCKET_NAME = os.getenv('BUCKET_NAME')
@@ -16,6 +69,35 @@ class MinIOConfig:
     # URL для доступа к файлам (если бакет публичный)
     PUBLIC_URL = f'http://{ENDPOINT}/{BUCKET_NAME}'
 
+    # Размер части при потоковой (multipart) загрузке, минимум MinIO - 5 МБ
+    PART_SIZE = int(os.getenv('MINIO_PART_SIZE', 5 * 1024 * 1024))
+
+    # Срок действия подписанных URL и шаг, с которым они переподписываются
+    URL_EXPIRES = int(os.getenv('MINIO_URL_EXPIRES', 24 * 3600))
+    URL_REFRESH = int(os.getenv('MINIO_URL_REFRESH', 3600))
+    URL_CACHE_SIZE = int(os.getenv('MINIO_URL_CACHE_SIZE', 10000))
+
+    # Настройки пула HTTP-соединений клиента
+    POOL_MAXSIZE = int(os.getenv('MINIO_POOL_MAXSIZE', 10))
+    CONNECT_TIMEOUT = float(os.getenv('MINIO_CONNECT_TIMEOUT', 5))
+    READ_TIMEOUT = float(os.getenv('MINIO_READ_TIMEOUT', 60))
+
+    @classmethod
+    def get_http_client(cls):
+        """Возвращает пул HTTP-соединений для клиента MinIO"""
+        return urllib3.PoolManager(
+            timeout=urllib3.Timeout(connect=cls.CONNECT_TIMEOUT, read=cls.READ_TIMEOUT),
+            maxsize=cls.POOL_MAXSIZE,
+            block=True,
+            cert_reqs='CERT_REQUIRED',
+            ca_certs=os.getenv('SSL_CERT_FILE') or certifi.where(),
+            retries=urllib3.Retry(
+                total=3,
+                backoff_factor=0.2,
+                status_forcelist=[500, 502, 503, 504]
+            )
+        )
+
     @classmethod
     def get_client(cls):
         """Возвращает клиент MinIO"""
@@ -23,7 +105,9 @@ class MinIOConfig:
             cls.ENDPOINT,
             access_key=cls.ACCESS_KEY,
             secret_key=cls.SECRET_KEY,
-            secure=cls.SECURE
+            secure=cls.SECURE,
+            region=cls.REGION,
+            http_client=cls.get_http_client()
         )
 
     @classmethod
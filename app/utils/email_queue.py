@@ -0,0 +1,67 @@
+from rq import Retry
+
+from app.tasks import send_user_email, send_artwork_rejected_email, send_bulk_notification
+from app.utils.config import MailQueueConfig
+from app.utils.task_queue import TaskQueue
+
+# Виды служебных писем пользователю
+VERIFICATION = 'verification'
+PASSWORD_RESET = 'password_reset'
+
+
+def _retry():
+    """Повторы с экспоненциальной задержкой"""
+    return Retry(
+        max=MailQueueConfig.RETRIES,
+        interval=[MailQueueConfig.BACKOFF * 2 ** attempt
+                  for attempt in range(MailQueueConfig.RETRIES)]
+    )
+
+
+class EmailQueue:
+    """
+    Постановка писем в очереди RQ.
+
+    У каждого письма пользователю детерминированный id задачи (вид письма +
+    id пользователя), поэтому повторные запросы, пока письмо ждет отправки или
+    отправлено меньше RESEND_COOLDOWN секунд назад, не создают новых задач.
+    Адрес и токен задача читает из базы при выполнении, так что письмо
+    уходит с актуальными данными. Служебные письма идут в очередь с высоким
+    приоритетом, рассылки - с низким. Если Redis недоступен, письмо уходит в
+    запасной путь TaskQueue, а метод возвращает None.
+    """
+
+    def __init__(self):
+        self.high = TaskQueue(MailQueueConfig.HIGH_QUEUE)
+        self.low = TaskQueue(MailQueueConfig.LOW_QUEUE)
+
+    def send_user_email(self, kind, user_id, force=False):
+        """
+        Письмо пользователю; force - данные письма изменились (новый адрес или токен),
+        и ни недавно отправленное, ни отправляемое сейчас письмо не заменяет новое.
+        """
+        return self.high.enqueue_unique(
+            send_user_email, kind, user_id,
+            job_id=f'email-{kind}-{user_id}',
+            replace_finished=force,
+            follow_started=force,
+            result_ttl=MailQueueConfig.RESEND_COOLDOWN,
+            retry=_retry()
+        )
+
+    def send_artwork_rejected(self, artwork_id, reason):
+        """Письмо автору об отклоненной работе"""
+        return self.high.enqueue_unique(
+            send_artwork_rejected_email, artwork_id, reason,
+            job_id=f'email-artwork-rejected-{artwork_id}',
+            retry=_retry()
+        )
+
+    def send_notification(self, notification_id):
+        """Массовая рассылка"""
+        return self.low.enqueue_unique(
+            send_bulk_notification, notification_id,
+            job_id=f'notification-{notification_id}',
+            job_timeout='6h',
+            retry=_retry()
+        )
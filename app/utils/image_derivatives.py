@@ -0,0 +1,41 @@
+import io
+
+from PIL import Image, ImageOps
+
+# Ширины уменьшенных копий: миниатюра, средний размер и набор для srcset
+THUMBNAIL_WIDTH = 320
+MEDIUM_WIDTH = 1280
+DERIVATIVE_WIDTHS = (THUMBNAIL_WIDTH, 640, MEDIUM_WIDTH)
+
+# Форматы: расширение файла -> (формат Pillow, content-type, параметры сохранения)
+DERIVATIVE_FORMATS = {
+    'jpg': ('JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+}
+
+
+def build_derivatives(file_data: bytes):
+    """
+    Строит уменьшенные копии изображения.
+
+    Возвращает список кортежей (ширина, расширение, content-type, байты).
+    Копии шире оригинала не создаются, но миниатюра есть всегда.
+    """
+    image = Image.open(io.BytesIO(file_data))
+    # Для JPEG декодер сразу уменьшает изображение, не распаковывая его целиком
+    image.draft('RGB', (MEDIUM_WIDTH, MEDIUM_WIDTH))
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    widths = [w for w in DERIVATIVE_WIDTHS if w < image.width] or [THUMBNAIL_WIDTH]
+
+    result = []
+    for width in widths:
+        height = max(1, round(image.height * min(1, width / image.width)))
+        resized = image.resize((min(width, image.width), height), Image.LANCZOS)
+        for extension, (pil_format, content_type, options) in DERIVATIVE_FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(buffer, pil_format, **options)
+            result.append((width, extension, content_type, buffer.getvalue()))
+    return result
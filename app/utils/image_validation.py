@@ -0,0 +1,125 @@
+import io
+import typing
+from dataclasses import dataclass, asdict
+from datetime import datetime
+
+from PIL import Image, UnidentifiedImageError
+
+# Сколько байт начала файла читается для проверки: EXIF в JPEG не больше 64 КБ
+HEADER_SIZE = 256 * 1024
+
+# Сигнатуры поддерживаемых форматов: (начало файла, формат Pillow, content-type)
+SIGNATURES = (
+    (b'\xff\xd8\xff', 'JPEG', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG', 'image/png'),
+    (b'GIF87a', 'GIF', 'image/gif'),
+    (b'GIF89a', 'GIF', 'image/gif'),
+)
+
+# Теги EXIF
+EXIF_MAKE = 0x010F
+EXIF_MODEL = 0x0110
+EXIF_ORIENTATION = 0x0112
+EXIF_DATETIME = 0x0132
+EXIF_IFD = 0x8769
+EXIF_DATETIME_ORIGINAL = 0x9003
+
+
+class ImageValidationError(Exception):
+    pass
+
+
+@dataclass()
+class ImageMetadata:
+    content_type: str
+    width: int
+    height: int
+    camera: str | None = None
+    taken_at: datetime | None = None
+    orientation: int | None = None
+
+    def to_dict(self):
+        data = asdict(self)
+        data['taken_at'] = self.taken_at.isoformat() if self.taken_at else None
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data)
+        if data.get('taken_at'):
+            data['taken_at'] = datetime.fromisoformat(data['taken_at'])
+        else:
+            data['taken_at'] = None
+        return cls(**data)
+
+
+class PrefixedStream:
+    """Поток, который сначала отдает уже прочитанное начало файла, затем остаток"""
+
+    def __init__(self, prefix: bytes, stream: typing.BinaryIO):
+        self.prefix = prefix
+        self.stream = stream
+
+    def read(self, size: int = -1) -> bytes:
+        if not self.prefix:
+            return self.stream.read(size)
+        if size < 0:
+            data, self.prefix = self.prefix + self.stream.read(), b''
+            return data
+        data, self.prefix = self.prefix[:size], self.prefix[size:]
+        return data
+
+
+def _clean(value):
+    if isinstance(value, bytes):
+        value = value.decode('utf-8', 'ignore')
+    return str(value).strip('\x00 ') if value is not None else ''
+
+
+def inspect_image(header: bytes) -> ImageMetadata:
+    """
+    Проверяет сигнатуру файла и извлекает размеры и EXIF по его началу.
+    Бросает ImageValidationError, если файл не является поддерживаемым изображением.
+    """
+    for signature, pil_format, content_type in SIGNATURES:
+        if header.startswith(signature):
+            break
+    else:
+        raise ImageValidationError('Файл не является изображением JPG, PNG или GIF')
+
+    try:
+        # Pillow читает только заголовок, пиксели не декодируются
+        image = Image.open(io.BytesIO(header), formats=[pil_format])
+        width, height = image.size
+        exif = image.getexif()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError) as e:
+        raise ImageValidationError(f'Поврежденный файл изображения: {e}')
+
+    parts = (_clean(exif.get(EXIF_MAKE)), _clean(exif.get(EXIF_MODEL)))
+    camera = ' '.join(part for part in parts if part)
+
+    taken_at = None
+    raw_date = exif.get_ifd(EXIF_IFD).get(EXIF_DATETIME_ORIGINAL) or exif.get(EXIF_DATETIME)
+    if raw_date:
+        try:
+            taken_at = datetime.strptime(_clean(raw_date), '%Y:%m:%d %H:%M:%S')
+        except ValueError:
+            pass
+
+    return ImageMetadata(
+        content_type=content_type,
+        width=width,
+        height=height,
+        camera=camera[:100] or None,
+        taken_at=taken_at,
+        orientation=exif.get(EXIF_ORIENTATION)
+    )
+
+
+def validate_stream(stream: typing.BinaryIO) -> tuple[ImageMetadata, typing.BinaryIO]:
+    """
+    Читает начало потока, проверяет его и возвращает метаданные и поток,
+    который отдает файл целиком, начиная с уже прочитанного заголовка.
+    """
+    header = stream.read(HEADER_SIZE)
+    return inspect_image(header), PrefixedStream(header, stream)
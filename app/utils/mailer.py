@@ -0,0 +1,101 @@
+import os
+import smtplib
+import threading
+import time
+
+from logger_setup import setup_logger
+
+logger = setup_logger('mailer')
+
+# Ошибки, после которых соединение считается потерянным и открывается заново
+CONNECTION_ERRORS = (
+    smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError
+)
+
+
+class SMTPSession:
+    """
+    Постоянное SMTP-соединение процесса.
+
+    Соединение открывается при первом письме и переиспользуется следующими;
+    если сервер его закрыл (простой, лимит писем на сессию), письмо
+    отправляется повторно через новое соединение.
+    """
+
+    def __init__(self, mail, max_idle=60):
+        self.mail = mail
+        self.max_idle = max_idle
+        self._connection = None
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+
+    def _open(self):
+        connection = self.mail.connect()
+        connection.__enter__()
+        return connection
+
+    def _alive(self):
+        """Долго простаивавшее соединение проверяется командой NOOP"""
+        if time.monotonic() - self._last_used < self.max_idle or self._connection.host is None:
+            return True
+        try:
+            return self._connection.host.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def send(self, message):
+        """Отправляет письмо; требует контекста приложения"""
+        with self._lock:
+            for attempt in (1, 2):
+                if self._connection is not None and not self._alive():
+                    self._close()
+                if self._connection is None:
+                    self._connection = self._open()
+                try:
+                    self._connection.send(message)
+                except CONNECTION_ERRORS as e:
+                    self._close()
+                    if attempt == 2:
+                        raise
+                    logger.warning("SMTP-соединение потеряно, переподключаемся: %s", e)
+                    continue
+                self._last_used = time.monotonic()
+                return
+
+    def _close(self):
+        connection, self._connection = self._connection, None
+        if connection is None or connection.host is None:
+            return
+        try:
+            connection.host.quit()
+        except (smtplib.SMTPException, OSError):
+            connection.host.close()
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+
+_session: SMTPSession | None = None
+_session_lock = threading.Lock()
+
+
+def get_smtp_session(mail):
+    """Общее для процесса SMTP-соединение"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = SMTPSession(mail)
+    return _session
+
+
+def _reset_session():
+    """Сокет SMTP нельзя делить с дочерним процессом после fork"""
+    global _session, _session_lock
+    _session = None
+    _session_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_session)
@@ -1,29 +1,56 @@
-from app.utils.config import MinIOConfig
+import hashlib
 import io
+import os
+import threading
+import typing
+from datetime import datetime, timedelta
+
+from app.utils.storage_backends import StorageBackend, ObjectInfo, create_backend
 
 from logger_setup import setup_logger
 
 logger = setup_logger('artwork_storage')
 
 
+class HashingReader:
+    """
+    Обертка над потоком, которая считает SHA-256 и размер прочитанных данных.
+    Хеш вычисляется по ходу загрузки, без повторного чтения файла.
+    """
+
+    def __init__(self, stream: typing.BinaryIO):
+        self.stream = stream
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read(size)
+        self.sha256.update(data)
+        self.size += len(data)
+        return data
+
+    def hexdigest(self) -> str:
+        return self.sha256.hexdigest()
+
+
 class ArtworkStorage:
-    def __init__(self):
-        self.client = MinIOConfig.get_client()
-        self.bucket = MinIOConfig.BUCKET_NAME
-        logger.debug("Инициализация MinIO клиента... Бакет: %s", self.bucket)
+    def __init__(self, backend: StorageBackend | None = None):
+        self.backend = backend or create_backend()
+        self.bucket = self.backend.bucket
+        logger.debug("Инициализация хранилища %s... Бакет: %s",
+                     type(self.backend).__name__, self.bucket)
 
         # Проверяем подключение
         self._check_connection()
 
     def _check_connection(self):
-        """Проверяет подключение к MinIO"""
+        """Проверяет подключение к хранилищу"""
         try:
             # Проверяем существует ли нужный бакет
-            if not self.client.bucket_exists(self.bucket):
-                self.client.make_bucket(self.bucket)
+            self.backend.ensure_ready()
 
         except Exception as e:
-            logger.error("Ошибка подключения к MinIO: %s", e)
+            logger.error("Ошибка подключения к хранилищу: %s", e)
             raise
 
     def upload_image(
@@ -35,33 +62,42 @@ class ArtworkStorage:
         """
         Упрощенная загрузка без ресайза
         """
+        logger.debug("Размер файла: %s байт", len(file_data))
+        return self.upload_stream(io.BytesIO(file_data), filename, content_type,
+                                  length=len(file_data))
+
+    def upload_stream(
+            self,
+            stream: typing.BinaryIO,
+            filename: str,
+            content_type: str = "image/jpeg",
+            length: int = -1
+    ) -> dict:
+        """
+        Потоковая загрузка файла в хранилище без чтения его целиком в память.
+
+        При неизвестной длине (length=-1) файл отправляется multipart-загрузкой
+        частями по MinIOConfig.PART_SIZE, поэтому в памяти одновременно
+        находится не больше одной части.
+        """
         try:
             logger.debug("Начало загрузки файла: %s", filename)
 
-            file_size = len(file_data)
-            logger.debug("Размер файла: %s байт", file_size)
-
             # Метаданные файла
             metadata = {
                 'Content-Type': content_type,
                 'Cache-Control': 'max-age=31536000',
             }
 
-
-            # Загрузка файла в MinIO
-            self.client.put_object(
-                bucket_name=self.bucket,
-                object_name=filename,
-                data=io.BytesIO(file_data),
-                length=file_size,
-                content_type=content_type,
-                metadata=metadata
-            )
+            # Загрузка файла в хранилище с подсчетом SHA-256
+            reader = HashingReader(stream)
+            self.backend.put_stream(filename, reader, content_type, length=length,
+                                    metadata=metadata)
 
             logger.debug("Файл %s успешно загружен", filename)
 
             # Генерация URL
-            public_url = f"{MinIOConfig.PUBLIC_URL}/{filename}"
+            public_url = self.backend.public_url(filename)
 
             # Используем self.get_presigned_url
             signed_url = self.get_presigned_url(filename)
@@ -73,30 +109,136 @@ class ArtworkStorage:
                 'filename': filename,
                 'url': public_url,
                 'signed_url': signed_url,
-                'bucket': self.bucket
+                'bucket': self.bucket,
+                'sha256': reader.hexdigest(),
+                'size': reader.size
             }
 
         except Exception as e:
             logger.error("Ошибка при загрузке: %s", e)
             return {
                 'success': False,
-                'error': f"MinIO error: {str(e)}"
+                'error': f"Storage error: {str(e)}"
             }
 
-    def get_presigned_url(self, filename: str, expires: int = 3600) -> str:
+    def presigned_post(
+            self,
+            filename: str,
+            content_type: str,
+            max_size: int,
+            expires: int = 600
+    ) -> dict:
+        """
+        Генерирует политику POST для загрузки файла из браузера напрямую в хранилище.
+
+        Политика разрешает только один ключ, один content-type и размер
+        не больше max_size.
+        """
+        return self.backend.presigned_post(filename, content_type, max_size, expires)
+
+    def create_multipart_upload(self, filename: str, content_type: str) -> str:
+        """
+        Начинает multipart-загрузку и возвращает ее upload_id
+        """
+        return self.backend.create_multipart_upload(filename, content_type)
+
+    def upload_part(self, filename: str, upload_id: str, part_number: int, data: bytes) -> str:
+        """
+        Загружает часть multipart-загрузки и возвращает ее etag
+        """
+        return self.backend.upload_part(filename, upload_id, part_number, data)
+
+    def complete_multipart_upload(self, filename: str, upload_id: str, parts: list):
+        """
+        Собирает объект из загруженных частей. parts - список (номер, etag)
+        """
+        self.backend.complete_multipart_upload(filename, upload_id, parts)
+
+    def abort_multipart_upload(self, filename: str, upload_id: str):
+        """Отменяет multipart-загрузку и удаляет загруженные части"""
+        self.backend.abort_multipart_upload(filename, upload_id)
+
+    def stat(self, filename: str) -> ObjectInfo | None:
+        """
+        Возвращает сведения об объекте или None, если объекта нет
+        """
+        return self.backend.stat(filename)
+
+    def delete(self, filename: str):
+        """Удаляет объект"""
+        self.backend.delete(filename)
+
+    def list_prefix(self, prefix: str) -> typing.Iterator[str]:
+        """Ключи всех объектов с префиксом"""
+        return self.backend.list_prefix(prefix)
+
+    def read_object(self, filename: str) -> bytes:
+        """
+        Читает объект целиком (используется фоновыми задачами)
+        """
+        return self.backend.read(filename)
+
+    def iter_chunks(self, filename: str, chunk_size: int = 1024 * 1024) -> typing.Iterator[bytes]:
+        """
+        Читает объект частями по chunk_size байт
+        """
+        return self.backend.iter_chunks(filename, chunk_size)
+
+    def public_url(self, filename: str) -> str:
+        """Постоянный URL файла"""
+        return self.backend.public_url(filename)
+
+    def get_presigned_url(
+            self,
+            filename: str,
+            expires: int = 3600,
+            request_date: datetime | None = None
+    ) -> str:
         """
         Генерирует подписанный URL для временного доступа к файлу
         """
-        from datetime import timedelta
         try:
-            return self.client.presigned_get_object(
-                bucket_name=self.bucket,
-                object_name=filename,
-                expires=timedelta(seconds=expires)
-            )
+            return self.backend.presign(filename, timedelta(seconds=expires), request_date)
         except Exception as e:
             logger.error("Ошибка генерации подписанного URL: %s", e)
-            return f"{MinIOConfig.PUBLIC_URL}/{filename}"
+            return self.backend.public_url(filename)
+
+
+_storage: ArtworkStorage | None = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> ArtworkStorage:
+    """
+    Возвращает общий для процесса экземпляр ArtworkStorage.
+
+    Клиент создается лениво при первом обращении, поэтому проверка бакета
+    выполняется один раз на процесс, а не на каждую загрузку.
+    """
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = ArtworkStorage()
+    return _storage
+
+
+def _reset_storage():
+    """Сбрасывает клиент в дочернем процессе: пул соединений нельзя делить после fork"""
+    global _storage, _storage_lock
+    _storage = None
+    _storage_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_storage)
+
+
+def s3_key_prefix(competition_id, nomination_id, user_id):
+    """
+    Префикс ключей работ пользователя в номинации
+    """
+    return f"competitions/{competition_id}/nominations/{nomination_id}/users/{user_id}/"
 
 
 def generate_s3_key(competition_id, nomination_id, user_id, original_filename, file_extension=None):
@@ -104,7 +246,6 @@ def generate_s3_key(competition_id, nomination_id, user_id, original_filename, f
     Генерирует S3 ключ для хранения работы
     """
     import uuid
-    from datetime import datetime
 
     # Получаем расширение файла
     if file_extension is None:
@@ -123,6 +264,16 @@ def generate_s3_key(competition_id, nomination_id, user_id, original_filename, f
     month = now.strftime('%m')
 
     # Структура ключа
-    s3_key = f"competitions/{competition_id}/nominations/{nomination_id}/users/{user_id}/{year}/{month}/{file_uuid}.{file_extension}"
+    prefix = s3_key_prefix(competition_id, nomination_id, user_id)
+    s3_key = f"{prefix}{year}/{month}/{file_uuid}.{file_extension}"
 
-    return s3_key
\ No newline at end of file
+    return s3_key
+
+
+def derivative_key(s3_key, width, file_extension):
+    """
+    Генерирует ключ уменьшенной копии рядом с оригиналом:
+    .../<uuid>.jpg -> .../<uuid>_w640.webp
+    """
+    base = s3_key.rsplit('.', 1)[0] if '.' in s3_key.rsplit('/', 1)[-1] else s3_key
+    return f"{base}_w{width}.{file_extension}"
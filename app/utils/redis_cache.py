@@ -0,0 +1,61 @@
+import time
+
+from redis import RedisError
+
+from app.utils.task_queue import get_redis
+from logger_setup import setup_logger
+
+logger = setup_logger('redis_cache')
+
+
+class RedisCache:
+    """
+    Основа кэшей в Redis.
+
+    Кэш не должен замедлять запросы: при ошибке Redis методы возвращают промах,
+    а обращения к Redis пропускаются retry_after секунд.
+    """
+
+    def __init__(self, prefix, retry_after=30):
+        self.prefix = prefix
+        self.retry_after = retry_after
+        self._down_until = 0.0
+
+    @property
+    def redis(self):
+        # Общий пул соединений процесса с таймаутами из конфигурации приложения
+        return get_redis()
+
+    def _key(self, key):
+        return f"{self.prefix}{key}"
+
+    def _available(self):
+        return time.monotonic() >= self._down_until
+
+    def _failed(self, action, key, error):
+        logger.warning("Кэш %s недоступен (%s %s): %s", self.prefix, action, key, error)
+        self._down_until = time.monotonic() + self.retry_after
+
+    def get(self, key):
+        if not self._available():
+            return None
+        try:
+            return self.redis.get(self._key(key))
+        except RedisError as e:
+            self._failed('get', key, e)
+            return None
+
+    def set(self, key, value, ttl):
+        if not self._available():
+            return
+        try:
+            self.redis.set(self._key(key), value, ex=max(int(ttl), 1))
+        except RedisError as e:
+            self._failed('set', key, e)
+
+    def delete(self, key):
+        # Сброс пробуем всегда, даже если Redis недавно был недоступен
+        try:
+            self.redis.delete(self._key(key))
+        except RedisError as e:
+            self._failed('delete', key, e)
@@ -0,0 +1,62 @@
+import threading
+import time
+from dataclasses import dataclass
+
+from app.utils.config import CacheConfig
+
+
+@dataclass(frozen=True)
+class RoleInfo:
+    """Роль, не привязанная к сессии SQLAlchemy"""
+    id: int
+    title: str
+    display_name: str
+    access: bool
+
+
+class RolesCache:
+    """
+    Таблица roles в памяти процесса.
+
+    Таблица маленькая и почти не меняется, поэтому читается целиком и хранится
+    ttl секунд; правки через админку сбрасывают кэш сразу (в своем процессе).
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._roles = None
+        self._loaded_at = 0.0
+
+    @staticmethod
+    def _load():
+        from app.models import Roles
+        return {
+            role.id: RoleInfo(id=role.id, title=role.title, display_name=role.display_name,
+                              access=role.access)
+            for role in Roles.query.order_by(Roles.id)
+        }
+
+    def all(self, refresh=False):
+        """Все роли: {id: RoleInfo}"""
+        with self._lock:
+            if refresh or self._roles is None or time.monotonic() - self._loaded_at > self.ttl:
+                self._roles = self._load()
+                self._loaded_at = time.monotonic()
+            return self._roles
+
+    def get(self, role_id):
+        """Роль по id; неизвестный id перечитывает таблицу один раз"""
+        if role_id is None:
+            return None
+        role = self.all().get(role_id)
+        if role is None:
+            role = self.all(refresh=True).get(role_id)
+        return role
+
+    def invalidate(self):
+        with self._lock:
+            self._roles = None
+
+
+roles_cache = RolesCache(CacheConfig.ROLES_TTL)
@@ -0,0 +1,400 @@
+import abc
+import hashlib
+import hmac
+import mimetypes
+import os
+import shutil
+import time
+import typing
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from urllib.parse import quote, urlencode
+
+import minio
+from minio.datatypes import Part, PostPolicy
+from minio.error import S3Error
+
+from app.utils.config import MinIOConfig, LocalStorageConfig, StorageConfig
+
+
+@dataclass()
+class ObjectInfo:
+    key: str
+    size: int
+    content_type: str | None
+    etag: str | None = None
+    last_modified: datetime | None = None
+
+
+class StorageBackend(abc.ABC):
+    """
+    Интерфейс хранилища объектов, с которым работает ArtworkStorage
+    """
+
+    def ensure_ready(self):
+        """Проверяет доступность хранилища; вызывается один раз при создании клиента"""
+
+    @abc.abstractmethod
+    def put_stream(self, key: str, stream: typing.BinaryIO, content_type: str,
+                   length: int = -1, metadata: dict | None = None):
+        """Сохраняет поток под ключом key"""
+
+    @abc.abstractmethod
+    def stat(self, key: str) -> ObjectInfo | None:
+        """Сведения об объекте или None, если объекта нет"""
+
+    @abc.abstractmethod
+    def presign(self, key: str, expires: timedelta, request_date: datetime | None = None) -> str:
+        """Подписанный URL для чтения объекта"""
+
+    @abc.abstractmethod
+    def delete(self, key: str):
+        """Удаляет объект"""
+
+    @abc.abstractmethod
+    def list_prefix(self, prefix: str) -> typing.Iterator[str]:
+        """Ключи всех объектов с префиксом prefix"""
+
+    @abc.abstractmethod
+    def read(self, key: str) -> bytes:
+        """Содержимое объекта целиком"""
+
+    @abc.abstractmethod
+    def iter_chunks(self, key: str, chunk_size: int) -> typing.Iterator[bytes]:
+        """Содержимое объекта частями, без загрузки целиком в память"""
+
+    @abc.abstractmethod
+    def public_url(self, key: str) -> str:
+        """Постоянный (неподписанный) URL объекта"""
+
+    @abc.abstractmethod
+    def presigned_post(self, key: str, content_type: str, max_size: int, expires: int) -> dict:
+        """
+        Политика POST для загрузки из браузера напрямую в хранилище:
+        {'url': адрес формы, 'fields': поля формы перед полем file}
+        """
+
+    @abc.abstractmethod
+    def create_multipart_upload(self, key: str, content_type: str) -> str:
+        """Начинает загрузку частями и возвращает ее идентификатор"""
+
+    @abc.abstractmethod
+    def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        """Сохраняет часть и возвращает ее etag"""
+
+    @abc.abstractmethod
+    def complete_multipart_upload(self, key: str, upload_id: str, parts: list):
+        """Собирает объект из частей; parts - список (номер, etag)"""
+
+    @abc.abstractmethod
+    def abort_multipart_upload(self, key: str, upload_id: str):
+        """Отменяет загрузку частями"""
+
+
+class MinIOMultipart:
+    """
+    Загрузка частями через закрытые методы клиента minio.
+
+    Публичного API для отдельных частей в minio нет. Сигнатуры закрытых
+    методов проверены на версии VERSION (она же закреплена в requirements.txt);
+    минорный выпуск minio может изменить их без предупреждения, поэтому на
+    другой версии обертка не создается, а обновление minio требует сверки
+    этих вызовов.
+    """
+
+    VERSION = '7.2.20'
+
+    def __init__(self, client, bucket):
+        if minio.__version__ != self.VERSION:
+            raise RuntimeError(f"Загрузка частями проверена на minio {self.VERSION}, "
+                               f"установлена {minio.__version__}")
+        self.client = client
+        self.bucket = bucket
+
+    def create(self, key, headers):
+        return self.client._create_multipart_upload(self.bucket, key, headers)
+
+    def upload_part(self, key, upload_id, part_number, data):
+        return self.client._upload_part(self.bucket, key, data, None, upload_id, part_number)
+
+    def complete(self, key, upload_id, parts):
+        self.client._complete_multipart_upload(self.bucket, key, upload_id, parts)
+
+    def abort(self, key, upload_id):
+        self.client._abort_multipart_upload(self.bucket, key, upload_id)
+
+
+class MinIOBackend(StorageBackend):
+    def __init__(self, client=None, bucket=None):
+        self.client = client or MinIOConfig.get_client()
+        self.bucket = bucket or MinIOConfig.BUCKET_NAME
+        self._multipart = None
+
+    @property
+    def multipart(self):
+        """Обертка загрузки частями; создается при первой загрузке частями"""
+        if self._multipart is None:
+            self._multipart = MinIOMultipart(self.client, self.bucket)
+        return self._multipart
+
+    def ensure_ready(self):
+        # Проверяем существует ли нужный бакет
+        if not self.client.bucket_exists(self.bucket):
+            self.client.make_bucket(self.bucket)
+
+    def put_stream(self, key, stream, content_type, length=-1, metadata=None):
+        self.client.put_object(
+            bucket_name=self.bucket,
+            object_name=key,
+            data=stream,
+            length=length,
+            content_type=content_type,
+            metadata=metadata,
+            part_size=MinIOConfig.PART_SIZE
+        )
+
+    def stat(self, key):
+        try:
+            result = self.client.stat_object(bucket_name=self.bucket, object_name=key)
+        except S3Error as e:
+            if e.code in ('NoSuchKey', 'NoSuchObject'):
+                return None
+            raise
+        return ObjectInfo(key=key, size=result.size, content_type=result.content_type,
+                          etag=result.etag, last_modified=result.last_modified)
+
+    def presign(self, key, expires, request_date=None):
+        return self.client.presigned_get_object(
+            bucket_name=self.bucket,
+            object_name=key,
+            expires=expires,
+            request_date=request_date
+        )
+
+    def delete(self, key):
+        self.client.remove_object(bucket_name=self.bucket, object_name=key)
+
+    def list_prefix(self, prefix):
+        for obj in self.client.list_objects(self.bucket, prefix=prefix, recursive=True):
+            yield obj.object_name
+
+    def read(self, key):
+        response = self.client.get_object(bucket_name=self.bucket, object_name=key)
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+
+    def iter_chunks(self, key, chunk_size):
+        response = self.client.get_object(bucket_name=self.bucket, object_name=key)
+        try:
+            yield from response.stream(chunk_size)
+        finally:
+            response.close()
+            response.release_conn()
+
+    def public_url(self, key):
+        return f"{MinIOConfig.PUBLIC_URL}/{key}"
+
+    def presigned_post(self, key, content_type, max_size, expires):
+        policy = PostPolicy(self.bucket, datetime.now(timezone.utc) + timedelta(seconds=expires))
+        policy.add_equals_condition('key', key)
+        policy.add_equals_condition('Content-Type', content_type)
+        policy.add_content_length_range_condition(1, max_size)
+
+        fields = self.client.presigned_post_policy(policy)
+        fields['key'] = key
+        fields['Content-Type'] = content_type
+
+        scheme = 'https' if MinIOConfig.SECURE else 'http'
+        return {
+            'url': f"{scheme}://{MinIOConfig.ENDPOINT}/{self.bucket}/",
+            'fields': fields
+        }
+
+    def create_multipart_upload(self, key, content_type):
+        headers = {
+            'Content-Type': content_type,
+            'Cache-Control': 'max-age=31536000',
+        }
+        return self.multipart.create(key, headers)
+
+    def upload_part(self, key, upload_id, part_number, data):
+        return self.multipart.upload_part(key, upload_id, part_number, data)
+
+    def complete_multipart_upload(self, key, upload_id, parts):
+        self.multipart.complete(
+            key, upload_id,
+            [Part(part_number, etag) for part_number, etag in sorted(parts)]
+        )
+
+    def abort_multipart_upload(self, key, upload_id):
+        try:
+            self.multipart.abort(key, upload_id)
+        except S3Error as e:
+            # Загрузка уже завершена или отменена
+            if e.code != 'NoSuchUpload':
+                raise
+
+
+class LocalFSBackend(StorageBackend):
+    """
+    Хранилище в локальном каталоге - для разработки, тестов и сравнения с MinIO.
+
+    Подписанные URL и политики POST указывают на маршруты Flask
+    (app.views.storage), которые проверяют HMAC-подпись и срок действия,
+    отдают и принимают файлы.
+    """
+
+    MULTIPART_DIR = '.multipart'
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, root=None, signing_key=None, url_prefix=None):
+        self.root = Path(root or LocalStorageConfig.ROOT).resolve()
+        signing_key = signing_key or LocalStorageConfig.SIGNING_KEY
+        if not signing_key:
+            # С пустым ключом подпись URL может вычислить кто угодно
+            raise ValueError("Не задан ключ подписи локального хранилища "
+                             "(LOCAL_STORAGE_SIGNING_KEY или SECRET_KEY)")
+        self.signing_key = signing_key.encode()
+        self.url_prefix = url_prefix or LocalStorageConfig.URL_PREFIX
+        self.bucket = str(self.root)
+
+    def ensure_ready(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path(self, key):
+        """Путь к файлу объекта; ключ не может выходить за пределы каталога хранилища"""
+        path = (self.root / key).resolve()
+        if self.root not in path.parents:
+            raise ValueError(f"Недопустимый ключ: {key}")
+        return path
+
+    def put_stream(self, key, stream, content_type, length=-1, metadata=None):
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp_path, 'wb') as f:
+                shutil.copyfileobj(stream, f, self.CHUNK_SIZE)
+            os.replace(tmp_path, path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    def stat(self, key):
+        path = self.path(key)
+        if not path.is_file():
+            return None
+        st = path.stat()
+        return ObjectInfo(key=key, size=st.st_size, content_type=mimetypes.guess_type(path.name)[0],
+                          last_modified=datetime.fromtimestamp(st.st_mtime, tz=timezone.utc))
+
+    def signature(self, *parts):
+        message = '\n'.join(str(part) for part in parts).encode()
+        return hmac.new(self.signing_key, message, hashlib.sha256).hexdigest()
+
+    def _verify(self, expires_at, signature, *parts):
+        try:
+            expires_at = int(expires_at)
+        except (TypeError, ValueError):
+            return False
+        if expires_at < time.time():
+            return False
+        return hmac.compare_digest(self.signature(*parts, expires_at), signature or '')
+
+    def verify(self, key, expires_at, signature):
+        """Проверяет подпись и срок действия URL"""
+        return self._verify(expires_at, signature, key)
+
+    def verify_post(self, fields):
+        """Проверяет подпись и срок действия полей политики POST"""
+        return self._verify(fields.get('expires'), fields.get('signature'), 'POST',
+                            fields.get('key'), fields.get('Content-Type'),
+                            fields.get('max_size'))
+
+    def presign(self, key, expires, request_date=None):
+        signed_at = request_date or datetime.now(timezone.utc)
+        expires_at = int((signed_at + expires).timestamp())
+        query = urlencode({'expires': expires_at, 'signature': self.signature(key, expires_at)})
+        return f"{self.url_prefix}/{quote(key)}?{query}"
+
+    def presigned_post(self, key, content_type, max_size, expires):
+        expires_at = int(time.time()) + expires
+        fields = {
+            'key': key,
+            'Content-Type': content_type,
+            'max_size': str(max_size),
+            'expires': str(expires_at),
+        }
+        fields['signature'] = self.signature('POST', key, content_type, max_size, expires_at)
+        return {'url': f"{self.url_prefix}/", 'fields': fields}
+
+    def delete(self, key):
+        path = self.path(key)
+        if path.exists():
+            path.unlink()
+
+    def list_prefix(self, prefix):
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = sorted(d for d in dirnames if d != self.MULTIPART_DIR)
+            for filename in sorted(filenames):
+                if filename.endswith('.tmp'):
+                    continue
+                key = Path(dirpath, filename).relative_to(self.root).as_posix()
+                if key.startswith(prefix):
+                    yield key
+
+    def read(self, key):
+        return self.path(key).read_bytes()
+
+    def iter_chunks(self, key, chunk_size):
+        with open(self.path(key), 'rb') as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+
+    def public_url(self, key):
+        return f"{self.url_prefix}/{quote(key)}"
+
+    def _multipart_path(self, upload_id):
+        return self.path(f"{self.MULTIPART_DIR}/{upload_id}")
+
+    def create_multipart_upload(self, key, content_type):
+        upload_id = uuid.uuid4().hex
+        self._multipart_path(upload_id).mkdir(parents=True)
+        return upload_id
+
+    def upload_part(self, key, upload_id, part_number, data):
+        (self._multipart_path(upload_id) / str(part_number)).write_bytes(data)
+        return hashlib.md5(data).hexdigest()
+
+    def complete_multipart_upload(self, key, upload_id, parts):
+        parts_path = self._multipart_path(upload_id)
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            for part_number, _ in sorted(parts):
+                with open(parts_path / str(part_number), 'rb') as part:
+                    shutil.copyfileobj(part, f, self.CHUNK_SIZE)
+        shutil.rmtree(parts_path)
+
+    def abort_multipart_upload(self, key, upload_id):
+        shutil.rmtree(self._multipart_path(upload_id), ignore_errors=True)
+
+
+BACKENDS = {
+    'minio': MinIOBackend,
+    'local': LocalFSBackend,
+}
+
+
+def create_backend(name=None) -> StorageBackend:
+    """Создает бэкенд хранилища по имени (по умолчанию - из STORAGE_BACKEND)"""
+    name = name or StorageConfig.BACKEND
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Неизвестный бэкенд хранилища: {name}")
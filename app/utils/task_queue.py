@@ -0,0 +1,230 @@
+import os
+import threading
+import time
+
+import sqlalchemy as sa
+from flask import current_app
+from sqlalchemy.orm import Session
+from redis import BlockingConnectionPool, Redis, RedisError
+from redis.backoff import NoBackoff
+from redis.retry import Retry as RedisRetry
+from rq import Queue, Retry
+from rq.exceptions import DuplicateJobError, NoSuchJobError
+from rq.job import Job, JobStatus
+from rq.utils import import_attribute
+
+from app.extensions import db
+from app.models import TaskOutbox
+from logger_setup import setup_logger
+
+logger = setup_logger('task_queue')
+
+# Сколько секунд после ошибки Redis задачи сразу уходят в запасной путь
+RETRY_AFTER = 30
+
+# Задачи в этих статусах можно заменить новой с тем же id
+REPLACEABLE = (JobStatus.FAILED, JobStatus.STOPPED, JobStatus.CANCELED)
+
+_pool = None
+_pool_lock = threading.Lock()
+_down_until = 0.0
+
+
+def get_redis():
+    """
+    Клиент Redis на общем для процесса пуле соединений; требует контекста приложения.
+    Пул создается при первом обращении, а не при импорте, и заново после fork.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                config = current_app.config
+                _pool = BlockingConnectionPool.from_url(
+                    config['REDIS_URL'],
+                    max_connections=config['REDIS_MAX_CONNECTIONS'],
+                    # Сколько ждать свободного соединения, если все заняты
+                    timeout=config['REDIS_SOCKET_TIMEOUT'],
+                    socket_timeout=config['REDIS_SOCKET_TIMEOUT'],
+                    socket_connect_timeout=config['REDIS_CONNECT_TIMEOUT'],
+                    retry=RedisRetry(NoBackoff(), 0),
+                    health_check_interval=30
+                )
+    return Redis(connection_pool=_pool)
+
+
+def _reset_pool():
+    """Сокеты пула нельзя делить с дочерним процессом после fork"""
+    global _pool, _pool_lock, _down_until
+    _pool = None
+    _pool_lock = threading.Lock()
+    _down_until = 0.0
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_pool)
+
+
+def _func_path(func):
+    return func if isinstance(func, str) else f"{func.__module__}.{func.__qualname__}"
+
+
+def _dump_options(options):
+    """Параметры постановки задачи в виде, пригодном для JSON"""
+    options = dict(options)
+    retry = options.pop('retry', None)
+    if retry is not None:
+        options['retry'] = {'max': retry.max, 'interval': retry.intervals}
+    return options
+
+
+def _load_options(options):
+    options = dict(options)
+    retry = options.pop('retry', None)
+    if retry is not None:
+        options['retry'] = Retry(max=retry['max'], interval=retry['interval'])
+    return options
+
+
+class TaskQueue:
+    """
+    Очередь RQ с запасным путем на случай недоступности Redis.
+
+    Соединение берется из общего пула только при постановке задачи. Если Redis
+    не отвечает, задача по настройке TASKS_FALLBACK сохраняется в таблицу
+    task_outbox (потом ее переносит в Redis relay_outbox) или выполняется
+    сразу в текущем процессе; следующие RETRY_AFTER секунд Redis не опрашивается.
+    Строка outbox пишется в отдельной сессии: транзакцию вызывающего кода
+    постановка задачи не фиксирует.
+    """
+
+    def __init__(self, name='default'):
+        self.name = name
+
+    @property
+    def connection(self):
+        return get_redis()
+
+    @property
+    def queue(self):
+        return Queue(self.name, connection=self.connection)
+
+    def enqueue(self, func, *args, kwargs=None, **options):
+        """
+        Ставит задачу в очередь; options - параметры RQ (job_id, job_timeout, retry...).
+        Возвращает Job или None, если задача ушла в запасной путь.
+        """
+        kwargs = kwargs or {}
+        if time.monotonic() >= _down_until:
+            try:
+                return self.queue.enqueue(func, args=args, kwargs=kwargs, **options)
+            except RedisError as e:
+                _redis_failed(func, e)
+        self._fallback(func, args, kwargs, options)
+        return None
+
+    def enqueue_unique(self, func, *args, job_id, kwargs=None, replace_finished=False,
+                       follow_started=False, **options):
+        """
+        Ставит задачу с id job_id, если такая же еще не ждет выполнения, и
+        возвращает ее Job; ожидающая задача с этим id возвращается вместо новой.
+        Задача, завершенная с ошибкой или отмененная, заменяется новой,
+        выполненная - только при replace_finished. Если задача уже выполняется,
+        при follow_started ставится одна задача-продолжение с id job_id-next,
+        которая увидит изменения, сделанные после начала первой.
+        Без Redis задача уходит в запасной путь и возвращается None.
+        """
+        job_ids = [job_id, f"{job_id}-next"] if follow_started else [job_id]
+        try:
+            for current_id in job_ids:
+                for _ in range(2):
+                    try:
+                        return self.enqueue(func, *args, kwargs=kwargs, job_id=current_id,
+                                            unique=True, **options)
+                    except DuplicateJobError:
+                        pass
+                    try:
+                        job = Job.fetch(current_id, connection=self.connection)
+                    except NoSuchJobError:
+                        # Задача истекла между попытками
+                        continue
+                    status = job.get_status()
+                    if status is None:
+                        continue
+                    if status in REPLACEABLE or (replace_finished and status == JobStatus.FINISHED):
+                        job.delete()
+                        continue
+                    if status == JobStatus.STARTED and current_id != job_ids[-1]:
+                        break
+                    logger.debug("Задача %s уже в очереди (%s), новая не создается",
+                                 current_id, status)
+                    return job
+            # Задача с этим id все время исчезала между постановкой и чтением:
+            # Redis доступен, поэтому ставим ее без проверки уникальности
+            return self.enqueue(func, *args, kwargs=kwargs, job_id=job_ids[-1], **options)
+        except RedisError as e:
+            _redis_failed(func, e)
+            self._fallback(func, args, kwargs or {}, dict(options, job_id=job_id, unique=True))
+            return None
+
+    def _fallback(self, func, args, kwargs, options):
+        if current_app.config['TASKS_FALLBACK'] == 'inline':
+            try:
+                (import_attribute(func) if isinstance(func, str) else func)(*args, **kwargs)
+            except Exception as e:
+                logger.error("Задача %s, выполненная без очереди, завершилась ошибкой: %s",
+                             _func_path(func), e)
+            return
+
+        job_id = options.get('job_id')
+        with Session(db.engine) as session:
+            if job_id and session.execute(
+                sa.select(TaskOutbox.id).where(TaskOutbox.job_id == job_id)
+            ).first():
+                # Такая задача уже отложена
+                return
+            session.add(TaskOutbox(
+                queue=self.name,
+                func=_func_path(func),
+                args=list(args),
+                kwargs=kwargs,
+                options=_dump_options(options),
+                job_id=job_id
+            ))
+            session.commit()
+
+
+def _redis_failed(func, error):
+    """Следующие RETRY_AFTER секунд задачи сразу уходят в запасной путь"""
+    global _down_until
+    logger.warning("Redis недоступен, задача %s не поставлена в очередь: %s",
+                   _func_path(func), error)
+    _down_until = time.monotonic() + RETRY_AFTER
+
+
+def relay_outbox(batch_size=100):
+    """Переносит отложенные задачи из task_outbox в Redis; возвращает их число"""
+    relayed = 0
+    while True:
+        rows = db.session.execute(
+            sa.select(TaskOutbox)
+            .order_by(TaskOutbox.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+        if not rows:
+            return relayed
+        try:
+            for row in rows:
+                try:
+                    Queue(row.queue, connection=get_redis()).enqueue(
+                        row.func, args=row.args, kwargs=row.kwargs, **_load_options(row.options)
+                    )
+                except DuplicateJobError:
+                    # Такая же задача уже в очереди
+                    pass
+                db.session.delete(row)
+                relayed += 1
+        finally:
+            # Перенесенные до ошибки Redis задачи удаляются из outbox
+            db.session.commit()
@@ -0,0 +1,79 @@
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+
+from app.utils.config import MinIOConfig
+from app.utils.minio_service import get_storage
+from logger_setup import setup_logger
+
+logger = setup_logger('url_resolver')
+
+
+class PresignedUrlResolver:
+    """
+    Выдает подписанные URL объектов по ключу S3.
+
+    Подпись вычисляется локально (регион клиента задан заранее), а время
+    подписи округляется вниз до шага refresh. Поэтому в пределах одного шага
+    URL объекта не меняется и берется из LRU-кэша по ключу (s3_key, шаг),
+    а переподписывается только при переходе к следующему шагу - когда до
+    истечения остается меньше expires - refresh секунд. Если подписать URL
+    не удалось, возвращается публичный URL объекта, но в кэш он не попадает.
+    """
+
+    def __init__(self, expires=MinIOConfig.URL_EXPIRES,
+                 refresh=MinIOConfig.URL_REFRESH, maxsize=MinIOConfig.URL_CACHE_SIZE):
+        if refresh >= expires:
+            raise ValueError("refresh должен быть меньше expires")
+        self.expires = expires
+        self.refresh = refresh
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self._lock = Lock()
+
+    def resolve(self, s3_key):
+        if not s3_key:
+            return None
+
+        step = int(time.time()) // self.refresh
+        cache_key = (s3_key, step)
+
+        with self._lock:
+            url = self._cache.get(cache_key)
+            if url is not None:
+                self._cache.move_to_end(cache_key)
+                return url
+
+        try:
+            url = self._sign(s3_key, step)
+        except Exception as e:
+            logger.error("Ошибка генерации подписанного URL: %s", e)
+            return get_storage().public_url(s3_key)
+
+        with self._lock:
+            self._cache[cache_key] = url
+            self._cache.move_to_end(cache_key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return url
+
+    def _sign(self, s3_key, step):
+        request_date = datetime.fromtimestamp(step * self.refresh, tz=timezone.utc)
+        # Без запасного пути get_presigned_url: ошибка подписи не должна попасть в кэш
+        return get_storage().backend.presign(s3_key, timedelta(seconds=self.expires), request_date)
+
+
+_resolver: PresignedUrlResolver | None = None
+
+
+def get_url_resolver() -> PresignedUrlResolver:
+    global _resolver
+    if _resolver is None:
+        _resolver = PresignedUrlResolver()
+    return _resolver
+
+
+def resolve_url(s3_key):
+    """Подписанный URL объекта по ключу S3"""
+    return get_url_resolver().resolve(s3_key)
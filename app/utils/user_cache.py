@@ -0,0 +1,78 @@
+import json
+
+from flask_login import UserMixin
+
+from app.extensions import db
+from app.models import Users
+from app.utils.config import CacheConfig
+from app.utils.redis_cache import RedisCache
+from app.utils.roles_cache import roles_cache
+
+# Поля, которых достаточно для авторизации и проверки статуса
+SNAPSHOT_FIELDS = ('id', 'status', 'role_id', 'email_confirmed')
+
+
+class UserSnapshot(UserMixin):
+    """
+    Сокращенная запись пользователя для Flask-Login.
+
+    Поля из SNAPSHOT_FIELDS читаются из кэша, остальные поля и методы Users
+    загружают полную строку из базы при первом обращении.
+    """
+
+    def __init__(self, id, status, role_id, email_confirmed, user=None):
+        self.id = id
+        self.status = status
+        self.role_id = role_id
+        self.email_confirmed = email_confirmed
+        self._user = user
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.status, user.role_id, user.email_confirmed, user=user)
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in SNAPSHOT_FIELDS}
+
+    @property
+    def role(self):
+        return roles_cache.get(self.role_id)
+
+    def load(self):
+        """Полная строка Users (загружается один раз за запрос)"""
+        if self._user is None:
+            self._user = db.session.get(Users, self.id)
+        return self._user
+
+    def __getattr__(self, name):
+        if name.startswith('_') or not hasattr(Users, name):
+            raise AttributeError(name)
+        return getattr(self.load(), name)
+
+
+class UserCache(RedisCache):
+    """Снимки пользователей в Redis с коротким временем жизни"""
+
+    def __init__(self, ttl, prefix='user:snapshot:'):
+        super().__init__(prefix)
+        self.ttl = ttl
+
+    def load(self, user_id):
+        """Снимок пользователя из Redis, при промахе - из базы с сохранением в Redis"""
+        cached = self.get(user_id)
+        if cached:
+            return UserSnapshot(**json.loads(cached))
+
+        user = db.session.get(Users, user_id)
+        if user is None:
+            return None
+        snapshot = UserSnapshot.from_user(user)
+        self.set(user_id, json.dumps(snapshot.to_dict()), self.ttl)
+        return snapshot
+
+    def invalidate(self, user_id):
+        """Сбрасывает снимок после изменения пользователя"""
+        self.delete(user_id)
+
+
+user_cache = UserCache(CacheConfig.USER_TTL)
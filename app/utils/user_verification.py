@@ -1,5 +1,5 @@
 from functools import wraps
-from flask import session, redirect, url_for, flash
+from flask import session, redirect, url_for, flash, abort
 from flask_login import current_user, logout_user
 
 
@@ -47,3 +47,24 @@ def active_user_required(f):
         return f(*args, **kwargs)
 
     return decorated_function
+
+
+def role_required(*titles):
+    """
+    Декоратор для проверки роли пользователя.
+    Неавторизованным и пользователям с другой ролью отвечает 403.
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not current_user.is_authenticated:
+                abort(403)
+            role = current_user.role
+            if role is None or role.title not in titles:
+                abort(403)
+            return f(*args, **kwargs)
+
+        return decorated_function
+
+    return decorator
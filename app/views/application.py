@@ -1,30 +1,108 @@
+import typing
 from datetime import datetime
 
-from flask import Blueprint, redirect, url_for, flash, render_template, abort, request, jsonify
+from flask import (
+    Blueprint, redirect, url_for, flash, render_template, request, jsonify, current_app
+)
 from flask_login import current_user
-from sqlalchemy.orm import joinedload
+import sqlalchemy as sa
 
 from app.extensions import db
-from app.models import Nominations, Roles, Ratings, Artworks, Competitions
-from app.utils.minio_service import ArtworkStorage, generate_s3_key
-from app.utils.user_verification import active_user_required
+from app.models import Nominations, Ratings, Artworks, Competitions, JuryAssignments, Users
+from app.utils.artwork_images import artwork_src
+from app.utils.config import JuryConfig
+from app.utils.image_validation import validate_stream, ImageValidationError
+from app.utils.task_queue import TaskQueue, get_redis
+from app.utils.minio_service import get_storage, generate_s3_key, s3_key_prefix
+from app.utils.user_verification import active_user_required, role_required
+from app.tasks import (
+    JURY_ASSIGNMENTS_JOB_ID, generate_artwork_derivatives, update_jury_assignments
+)
 from app.views.forms import SubmissionForm
-
+from app.services.assignment_service import AssignmentService
+from app.services.dedup_service import DedupService, DuplicateSubmission
+from app.services.rating_service import RatingService, RatingEntry, InvalidRating, MAX_BATCH_SIZE
+from app.services.upload_service import (ResumableUploadService, UploadNotFound, InvalidChunk,
+                                         UploadIncomplete)
+from logger_setup import setup_logger
+
+logger = setup_logger('application_routes')
 application_bp = Blueprint("application", __name__)
+task_queue = TaskQueue()
+
+
+# Лимит работ одного участника в номинации
+MAX_SUBMISSIONS_PER_NOMINATION = 3
+SUBMISSION_LIMIT_MESSAGE = (
+    f'Вы уже подали максимальное количество работ ({MAX_SUBMISSIONS_PER_NOMINATION}) '
+    'для этой номинации'
+)
+# Типы файлов, которые можно загрузить напрямую в хранилище
+ALLOWED_CONTENT_TYPES = {'image/jpeg', 'image/png', 'image/gif'}
+
+
+def _get_open_competition(competition_id):
+    """Активный конкурс, в котором еще идет прием работ"""
+    return Competitions.query.filter_by(id=competition_id, status="active").filter(
+        Competitions.end_of_accepting > datetime.now()).first()
+
+
+def _get_active_nomination(competition_id, nomination_id):
+    """Активная номинация, принадлежащая конкурсу"""
+    return Nominations.query.filter_by(
+        id=nomination_id,
+        competition_id=competition_id,
+        status="active"
+    ).first()
+
+
+def _submission_limit_reached(nomination_id):
+    """Проверяет, не превысил ли пользователь лимит заявок для номинации"""
+    existing_submissions = Artworks.query.filter_by(
+        user_id=current_user.id,
+        nomination_id=nomination_id
+    ).count()
+    return existing_submissions >= MAX_SUBMISSIONS_PER_NOMINATION
+
+
+def _create_submission(nomination_id, s3_key, file_url, title, content_hash=None, metadata=None):
+    """Создает заявку и ставит в очередь построение уменьшенных копий"""
+    # Если объект уже используется другой заявкой, его копии готовы
+    derivatives = DedupService.existing_derivatives(s3_key) if content_hash else None
+
+    submission = Artworks(
+        user_id=current_user.id,
+        nomination_id=nomination_id,
+        file=file_url,
+        s3_key=s3_key,
+        file_name=title,
+        status='for moderation',
+        content_hash=content_hash,
+        derivatives=derivatives
+    )
+    if metadata:
+        submission.set_image_metadata(metadata)
+    db.session.add(submission)
+    db.session.commit()
+
+    if derivatives:
+        return submission
+
+    # Уменьшенные копии строятся в фоне, до их готовности показывается оригинал
+    try:
+        task_queue.enqueue(generate_artwork_derivatives, submission.id)
+    except Exception as e:
+        logger.error("Не удалось поставить задачу построения копий работы %s: %s", submission.id, e)
+
+    return submission
 
 
 @application_bp.route("/participate/<int:competition_id>", methods=["GET", "POST"])
 @active_user_required
+@role_required('participant')
 def participate(competition_id):
-    if not current_user.is_authenticated:
-        abort(403)
-    current_user_role = Roles.query.filter_by(id=current_user.role_id).first()
-    if current_user_role.title != 'participant':
-        abort(403)
-
     # Проверяем существование конкурса
-    competition = Competitions.query.filter_by(id=competition_id, status="active").filter(
-        Competitions.end_of_accepting > datetime.now().strftime("%Y-%m-%d %H:%M:%S")).first()
+    competition = _get_open_competition(competition_id)
     if not competition:
         flash('Конкурс не найден или не активен', 'error')
         return redirect(url_for('index'))
@@ -47,143 +125,564 @@ def participate(competition_id):
         nomination_id = int(form.nomination_id.data)
 
         # Проверяем, существует ли выбранная номинация и принадлежит ли она конкурсу
-        nomination = Nominations.query.filter_by(
-            id=nomination_id,
-            competition_id=competition_id,
-            status="active"
-        ).first()
+        nomination = _get_active_nomination(competition_id, nomination_id)
 
         if not nomination:
             flash('Выбранная номинация недоступна', 'error')
             return render_template('participate.html', form=form, competition=competition, nominations=nominations)
 
         # Проверяем, не превысил ли пользователь лимит заявок для этой номинации
-        existing_submissions = Artworks.query.filter_by(
-            user_id=current_user.id,
-            nomination_id=nomination_id
-        ).count()
-
-        if existing_submissions >= 3:
-            flash('Вы уже подали максимальное количество работ (3) для этой номинации', 'error')
+        if _submission_limit_reached(nomination_id):
+            flash(SUBMISSION_LIMIT_MESSAGE, 'error')
             return render_template('participate.html', form=form, competition=competition, nominations=nominations)
 
-        # Сохраняем файл
+        # Проверяем заголовок файла до отправки в хранилище
         photo = form.photo.data
-        storage = ArtworkStorage()
-        file_bytes = photo.stream.read()
-        s3_key = generate_s3_key(competition_id, nomination_id, current_user.id, photo.filename)
-        upload_res = storage.upload_image(file_data=file_bytes, filename=s3_key, content_type=photo.mimetype)
-        print(upload_res)
+        try:
+            metadata, photo_stream = validate_stream(photo.stream)
+        except ImageValidationError as e:
+            flash(str(e), 'error')
+            return render_template('participate.html', form=form,
+                                   competition=competition, nominations=nominations)
 
+        # Сохраняем файл
+        storage = get_storage()
+        s3_key = generate_s3_key(competition_id, nomination_id, current_user.id, photo.filename)
+        upload_res = storage.upload_stream(stream=photo_stream, filename=s3_key,
+                                           content_type=metadata.content_type)
+        if not upload_res.get('success'):
+            flash('Не удалось сохранить файл. Пожалуйста, попробуйте позже.', 'error')
+            return render_template('participate.html', form=form,
+                                   competition=competition, nominations=nominations)
+
+        # Один и тот же файл хранится один раз, повтор в номинации отклоняется
+        content_hash = upload_res['sha256']
+        dedup_service = DedupService(db, storage)
+        try:
+            dedup_service.check_nomination(content_hash, nomination_id)
+        except DuplicateSubmission:
+            dedup_service.discard(s3_key)
+            flash('Эта фотография уже подана в выбранную номинацию', 'error')
+            return render_template('participate.html', form=form,
+                                   competition=competition, nominations=nominations)
+
+        file_key = dedup_service.resolve(content_hash, s3_key, upload_res['size'],
+                                         metadata.content_type)
 
         # Создаем заявку
-        submission = Artworks(
-            user_id=current_user.id,
-            nomination_id=nomination_id,
-            file=upload_res.get('signed_url'),
-            s3_key=s3_key,
-            file_name=form.description.data,
-            status='for moderation'
-        )
-        db.session.add(submission)
-        db.session.commit()
+        _create_submission(nomination_id, file_key, storage.public_url(file_key),
+                           form.description.data, content_hash=content_hash, metadata=metadata)
 
         flash('Ваша заявка успешно отправлена на модерацию!', 'success')
         return redirect(url_for('index'))
 
     return render_template('participate.html', form=form, competition=competition, nominations=nominations)
 
+
+@application_bp.route("/participate/<int:competition_id>/upload-policy", methods=["POST"])
+@active_user_required
+@role_required('participant')
+def participate_upload_policy(competition_id):
+    """Шаг 1 прямой загрузки: выдает политику POST для загрузки файла в MinIO"""
+    data = request.get_json(silent=True) or {}
+    try:
+        nomination_id = int(data.get('nomination_id'))
+    except (TypeError, ValueError):
+        nomination_id = None
+    filename = data.get('filename') or ''
+    content_type = data.get('content_type')
+
+    if not nomination_id or content_type not in ALLOWED_CONTENT_TYPES:
+        return jsonify({'success': False,
+                        'message': 'Только изображения (jpg, jpeg, png, gif)'}), 400
+
+    if not _get_open_competition(competition_id):
+        return jsonify({'success': False, 'message': 'Конкурс не найден или не активен'}), 404
+
+    if not _get_active_nomination(competition_id, nomination_id):
+        return jsonify({'success': False, 'message': 'Выбранная номинация недоступна'}), 404
+
+    if _submission_limit_reached(nomination_id):
+        return jsonify({'success': False, 'message': SUBMISSION_LIMIT_MESSAGE}), 400
+
+    s3_key = generate_s3_key(competition_id, nomination_id, current_user.id, filename)
+    try:
+        policy = get_storage().presigned_post(
+            s3_key, content_type, max_size=current_app.config['MAX_CONTENT_LENGTH'])
+    except Exception as e:
+        logger.error("Ошибка генерации политики загрузки: %s", e)
+        return jsonify({'success': False, 'message': 'Хранилище недоступно'}), 503
+
+    return jsonify({'success': True, 's3_key': s3_key,
+                    'url': policy['url'], 'fields': policy['fields']})
+
+
+@application_bp.route("/participate/<int:competition_id>/complete", methods=["POST"])
+@active_user_required
+@role_required('participant')
+def participate_complete(competition_id):
+    """Шаг 2 прямой загрузки: проверяет загруженный объект и создает заявку"""
+    data = request.get_json(silent=True) or {}
+    try:
+        nomination_id = int(data.get('nomination_id'))
+    except (TypeError, ValueError):
+        nomination_id = None
+    s3_key = data.get('s3_key') or ''
+    title = (data.get('description') or '').strip()
+
+    if not nomination_id or not title or len(title) > 254:
+        return jsonify({'success': False, 'message': 'Неверные данные'}), 400
+
+    # Ключ должен принадлежать пользователю и номинации
+    if not s3_key.startswith(s3_key_prefix(competition_id, nomination_id, current_user.id)):
+        return jsonify({'success': False, 'message': 'Неверный ключ файла'}), 400
+
+    # Повторный вызов для того же файла возвращает уже созданную заявку
+    existing = Artworks.query.filter_by(s3_key=s3_key, user_id=current_user.id).first()
+    if existing:
+        return jsonify({'success': True, 'artwork_id': existing.id, 'redirect': url_for('index')})
+
+    if not _get_open_competition(competition_id):
+        return jsonify({'success': False, 'message': 'Конкурс не найден или не активен'}), 404
+
+    if not _get_active_nomination(competition_id, nomination_id):
+        return jsonify({'success': False, 'message': 'Выбранная номинация недоступна'}), 404
+
+    if _submission_limit_reached(nomination_id):
+        return jsonify({'success': False, 'message': SUBMISSION_LIMIT_MESSAGE}), 400
+
+    storage = get_storage()
+    stat = storage.stat(s3_key)
+    if stat is None:
+        return jsonify({'success': False, 'message': 'Файл не загружен'}), 400
+
+    if (stat.size > current_app.config['MAX_CONTENT_LENGTH']
+            or stat.content_type not in ALLOWED_CONTENT_TYPES):
+        storage.delete(s3_key)
+        return jsonify({'success': False,
+                        'message': 'Только изображения (jpg, jpeg, png, gif) до 10MB'}), 400
+
+    file_url = storage.public_url(s3_key)
+    submission = _create_submission(nomination_id, s3_key, file_url, title)
+
+    flash('Ваша заявка успешно отправлена на модерацию!', 'success')
+    return jsonify({'success': True, 'artwork_id': submission.id, 'redirect': url_for('index')})
+
+
+def _upload_service():
+    return ResumableUploadService(get_redis(), get_storage())
+
+
+def _upload_state(upload_service, upload):
+    return {
+        'success': True,
+        'upload_token': upload.token,
+        'chunk_size': upload.chunk_size,
+        'part_count': upload.part_count,
+        'missing_parts': upload_service.missing_parts(upload)
+    }
+
+
+@application_bp.route("/participate/<int:competition_id>/uploads", methods=["POST"])
+@active_user_required
+@role_required('participant')
+def resumable_upload_start(competition_id):
+    """Начало возобновляемой загрузки: возвращает токен загрузки и размер части"""
+    data = request.get_json(silent=True) or {}
+    try:
+        nomination_id = int(data.get('nomination_id'))
+        size = int(data.get('size'))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Неверные данные'}), 400
+    filename = data.get('filename') or ''
+    content_type = data.get('content_type')
+    title = (data.get('description') or '').strip()
+
+    if not title or len(title) > 254:
+        return jsonify({'success': False, 'message': 'Неверные данные'}), 400
+
+    if (content_type not in ALLOWED_CONTENT_TYPES
+            or not 0 < size <= current_app.config['MAX_CONTENT_LENGTH']):
+        return jsonify({'success': False,
+                        'message': 'Только изображения (jpg, jpeg, png, gif) до 10MB'}), 400
+
+    if not _get_open_competition(competition_id):
+        return jsonify({'success': False, 'message': 'Конкурс не найден или не активен'}), 404
+
+    if not _get_active_nomination(competition_id, nomination_id):
+        return jsonify({'success': False, 'message': 'Выбранная номинация недоступна'}), 404
+
+    if _submission_limit_reached(nomination_id):
+        return jsonify({'success': False, 'message': SUBMISSION_LIMIT_MESSAGE}), 400
+
+    upload_service = _upload_service()
+    s3_key = generate_s3_key(competition_id, nomination_id, current_user.id, filename)
+    upload = upload_service.start(current_user.id, competition_id, nomination_id, s3_key,
+                                  content_type, size, title)
+    return jsonify(_upload_state(upload_service, upload)), 201
+
+
+@application_bp.route("/participate/uploads/<token>", methods=["GET"])
+@active_user_required
+@role_required('participant')
+def resumable_upload_status(token):
+    """Состояние загрузки: какие части еще не получены"""
+    upload_service = _upload_service()
+    try:
+        upload = upload_service.get(token, current_user.id)
+    except UploadNotFound:
+        return jsonify({'success': False, 'message': 'Загрузка не найдена'}), 404
+    return jsonify(_upload_state(upload_service, upload))
+
+
+@application_bp.route("/participate/uploads/<token>/parts/<int:part_number>", methods=["PUT"])
+@active_user_required
+@role_required('participant')
+def resumable_upload_part(token, part_number):
+    """Прием одной части файла; повторная отправка части перезаписывает ее"""
+    upload_service = _upload_service()
+    try:
+        upload = upload_service.get(token, current_user.id)
+        upload_service.put_part(upload, part_number, request.get_data(cache=False))
+    except UploadNotFound:
+        return jsonify({'success': False, 'message': 'Загрузка не найдена'}), 404
+    except InvalidChunk as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify(_upload_state(upload_service, upload))
+
+
+@application_bp.route("/participate/uploads/<token>/complete", methods=["POST"])
+@active_user_required
+@role_required('participant')
+def resumable_upload_complete(token):
+    """Сборка файла из частей и создание заявки"""
+    upload_service = _upload_service()
+    try:
+        upload = upload_service.get(token, current_user.id)
+    except UploadNotFound:
+        return jsonify({'success': False, 'message': 'Загрузка не найдена'}), 404
+
+    # Загрузка живет до суток: за это время прием работ мог завершиться
+    if not _get_open_competition(upload.competition_id):
+        upload_service.abort(upload)
+        return jsonify({'success': False, 'message': 'Конкурс не найден или не активен'}), 404
+
+    if not _get_active_nomination(upload.competition_id, upload.nomination_id):
+        upload_service.abort(upload)
+        return jsonify({'success': False, 'message': 'Выбранная номинация недоступна'}), 404
+
+    if _submission_limit_reached(upload.nomination_id):
+        upload_service.abort(upload)
+        return jsonify({'success': False, 'message': SUBMISSION_LIMIT_MESSAGE}), 400
+
+    # complete() удаляет состояние загрузки вместе с метаданными первой части
+    metadata = upload_service.metadata(upload)
+    try:
+        upload_service.complete(upload)
+    except UploadIncomplete:
+        return jsonify(dict(_upload_state(upload_service, upload), success=False,
+                            message='Получены не все части файла')), 409
+
+    file_url = get_storage().public_url(upload.s3_key)
+    submission = _create_submission(upload.nomination_id, upload.s3_key, file_url,
+                                    upload.description, metadata=metadata)
+
+    flash('Ваша заявка успешно отправлена на модерацию!', 'success')
+    return jsonify({'success': True, 'artwork_id': submission.id, 'redirect': url_for('index')})
+
+
+@application_bp.route("/participate/uploads/<token>", methods=["DELETE"])
+@active_user_required
+@role_required('participant')
+def resumable_upload_abort(token):
+    """Отмена загрузки"""
+    upload_service = _upload_service()
+    try:
+        upload = upload_service.get(token, current_user.id)
+    except UploadNotFound:
+        return jsonify({'success': False, 'message': 'Загрузка не найдена'}), 404
+    upload_service.abort(upload)
+    return jsonify({'success': True})
+
+
+# Размер страницы ленты голосования
+VOTING_PAGE_SIZE = 24
+MAX_VOTING_PAGE_SIZE = 100
+
+
+def _voting_artworks_query(nomination_id=None):
+    """Активные работы конкурсов, по которым еще идет голосование"""
+    query = (
+        Artworks.query
+        .join(Artworks.nomination)
+        .join(Nominations.competition)
+        .filter(Artworks.status == "active", Competitions.summing_up > datetime.now())
+    )
+    if nomination_id:
+        query = query.filter(Artworks.nomination_id == nomination_id)
+    return query
+
+
+def _jury_artworks_query(nomination_id=None):
+    """Работы ленты текущего члена жюри: назначенные ему или все работы на голосовании"""
+    query = _voting_artworks_query(nomination_id)
+    if JuryConfig.ASSIGNMENTS:
+        query = query.join(JuryAssignments, sa.and_(
+            JuryAssignments.work_id == Artworks.id,
+            JuryAssignments.jury_id == current_user.id
+        ))
+    return query
+
+
+def _parse_cursor(cursor):
+    """
+    Курсор ленты - позиция последней выданной работы в очереди назначений
+    или пара (nomination_id, id) последней выданной работы
+    """
+    if not cursor:
+        return None
+    try:
+        return tuple(int(part) for part in cursor.split(':'))
+    except ValueError:
+        return None
+
+
+class VotingArtwork(typing.NamedTuple):
+    """Строка ленты голосования: только поля, которые показывает карточка работы"""
+    id: int
+    file: str | None
+    s3_key: str | None
+    file_name: str | None
+    status: str | None
+    derivatives: dict | None
+    width: int | None
+    height: int | None
+    camera: str | None
+    taken_at: datetime | None
+    nomination_id: int
+    nomination_title: str | None
+    author_f_name: str
+    author_s_name: str
+    rate: int | None
+    jury_comment: str | None
+    position: int | None
+
+    @property
+    def author_name(self):
+        return f"{self.author_f_name} {self.author_s_name}"
+
+
+def _voting_rows_query(nomination_id=None):
+    """
+    Лента голосования одним SELECT только нужных столбцов, с оценкой
+    текущего члена жюри через LEFT JOIN; объекты ORM не создаются.
+    """
+    position = JuryAssignments.position if JuryConfig.ASSIGNMENTS else sa.null()
+    query = (
+        sa.select(
+            Artworks.id, Artworks.file, Artworks.s3_key, Artworks.file_name, Artworks.status,
+            Artworks.derivatives, Artworks.width, Artworks.height, Artworks.camera,
+            Artworks.taken_at,
+            Artworks.nomination_id, Nominations.title, Users.f_name, Users.s_name,
+            Ratings.rate, Ratings.jury_comment, position.label('position')
+        )
+        .join(Nominations, Artworks.nomination_id == Nominations.id)
+        .join(Competitions, Nominations.competition_id == Competitions.id)
+        .join(Users, Artworks.user_id == Users.id)
+        .outerjoin(Ratings, sa.and_(Ratings.work_id == Artworks.id,
+                                    Ratings.jury_id == current_user.id))
+        .where(Artworks.status == "active", Competitions.summing_up > datetime.now())
+    )
+    if JuryConfig.ASSIGNMENTS:
+        query = query.join(JuryAssignments, sa.and_(
+            JuryAssignments.work_id == Artworks.id,
+            JuryAssignments.jury_id == current_user.id
+        ))
+    if nomination_id:
+        query = query.where(Artworks.nomination_id == nomination_id)
+    return query
+
+
+def _voting_feed(nomination_id=None, cursor=None, limit=VOTING_PAGE_SIZE):
+    """
+    Страница ленты голосования с keyset-пагинацией: по позиции в очереди
+    назначений или по (nomination_id, id).
+
+    Возвращает строки VotingArtwork и курсор следующей страницы.
+    """
+    query = _voting_rows_query(nomination_id)
+    if JuryConfig.ASSIGNMENTS:
+        if cursor and len(cursor) == 1:
+            query = query.where(JuryAssignments.position > cursor[0])
+        query = query.order_by(JuryAssignments.position)
+    else:
+        if cursor and len(cursor) == 2:
+            after_nomination, after_id = cursor
+            query = query.where(sa.or_(
+                Artworks.nomination_id > after_nomination,
+                sa.and_(Artworks.nomination_id == after_nomination, Artworks.id > after_id)
+            ))
+        query = query.order_by(Artworks.nomination_id, Artworks.id)
+
+    artworks = [VotingArtwork._make(row) for row in db.session.execute(query.limit(limit + 1))]
+    has_more = len(artworks) > limit
+    artworks = artworks[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = artworks[-1]
+        if JuryConfig.ASSIGNMENTS:
+            next_cursor = str(last.position)
+        else:
+            next_cursor = f"{last.nomination_id}:{last.id}"
+    return artworks, next_cursor
+
+
+def _complete_assignments(work_ids):
+    """
+    Отмечает назначения текущего члена жюри выполненными (до фиксации транзакции);
+    возвращает число закрытых назначений
+    """
+    if not JuryConfig.ASSIGNMENTS:
+        return 0
+    return AssignmentService(db).complete(current_user.id, work_ids)
+
+
+def _rebalance_if_finished(completed):
+    """Когда член жюри оценил все назначенные работы, ему переносятся работы перегруженных коллег"""
+    if not completed or AssignmentService(db).pending_count(current_user.id):
+        return
+    try:
+        task_queue.enqueue_unique(update_jury_assignments, job_id=JURY_ASSIGNMENTS_JOB_ID,
+                                  replace_finished=True, follow_started=True)
+    except Exception as e:
+        logger.error("Не удалось поставить задачу перераспределения назначений: %s", e)
+
+
 @application_bp.route("/vote", methods=["GET", "POST"])
 @active_user_required
+@role_required('jury')
 def jury_voting():
-    if not current_user.is_authenticated:
-        abort(403)
-    current_user_role = Roles.query.filter_by(id=current_user.role_id).first()
-    if current_user_role.title != 'jury':
-        abort(403)
-
-        # Получаем все работы для оценки с загрузкой связанных данных
-    artworks = Artworks.query.options(
-        joinedload(Artworks.author),
-        joinedload(Artworks.nomination)
-    ).filter_by(status="active").filter(Competitions.summing_up > datetime.now().strftime("%Y-%m-%d %H:%M:%S")).all()
-
-    # Получаем оценки текущего жюри
-    user_ratings = Ratings.query.filter_by(jury_id=current_user.id).all()
-    ratings_dict = {rating.work_id: rating for rating in user_ratings}
-
-    # Добавляем информацию о оценках пользователя к работам
-    for artwork in artworks:
-        artwork.user_rating = ratings_dict.get(artwork.id)
-        if artwork.file and not artwork.file.startswith('http'):
-            pass
+    nomination_id = request.args.get('nomination_id', type=int)
+
+    # Первая страница ленты, остальные подгружаются через /vote/feed
+    artworks, next_cursor = _voting_feed(nomination_id)
+
+    # Номинации, по которым идет голосование, для фильтра
+    nominations = (
+        Nominations.query
+        .join(Nominations.competition)
+        .filter(Competitions.summing_up > datetime.now())
+        .order_by(Nominations.id)
+        .all()
+    )
 
     # Статистика
-    total_artworks = len(artworks)
-    rated_artworks = len(user_ratings)
+    total_artworks = _jury_artworks_query(nomination_id).count()
+    rated_artworks = _jury_artworks_query(nomination_id).join(
+        Ratings, sa.and_(Ratings.work_id == Artworks.id, Ratings.jury_id == current_user.id)
+    ).count()
     remaining_artworks = total_artworks - rated_artworks
     progress_percentage = round((rated_artworks / total_artworks) * 100) if total_artworks > 0 else 0
 
     return render_template('jury_voting.html',
                            artworks=artworks,
+                           next_cursor=next_cursor,
+                           nominations=nominations,
+                           selected_nomination_id=nomination_id,
                            total_artworks=total_artworks,
                            rated_artworks=rated_artworks,
                            remaining_artworks=remaining_artworks,
                            progress_percentage=progress_percentage)
 
 
+@application_bp.route("/vote/feed", methods=["GET"])
+@active_user_required
+@role_required('jury')
+def jury_voting_feed():
+    """Следующая страница ленты голосования в JSON"""
+    nomination_id = request.args.get('nomination_id', type=int)
+    limit = min(request.args.get('limit', VOTING_PAGE_SIZE, type=int), MAX_VOTING_PAGE_SIZE)
+    cursor = _parse_cursor(request.args.get('cursor'))
+    artworks, next_cursor = _voting_feed(nomination_id, cursor, max(limit, 1))
+
+    return jsonify({
+        'success': True,
+        'items': [{
+            'id': artwork.id,
+            'title': artwork.file_name,
+            'nomination_id': artwork.nomination_id,
+            'nomination': artwork.nomination_title,
+            'author': artwork.author_name,
+            'image': artwork_src(artwork),
+            'rating': artwork.rate,
+            'jury_comment': artwork.jury_comment,
+        } for artwork in artworks],
+        'html': ''.join(render_template('jury_artwork_card.html', artwork=artwork)
+                        for artwork in artworks),
+        'next_cursor': next_cursor
+    })
+
+
 @application_bp.route("/jury/rate", methods=["GET", "POST"])
 @active_user_required
+@role_required('jury')
 def rate_artwork():
-    if not current_user.is_authenticated:
-        abort(403)
-    current_user_role = Roles.query.filter_by(id=current_user.role_id).first()
-    if current_user_role.title != 'jury':
-        abort(403)
-
-    data = request.get_json()
-    artwork_id = data.get('artwork_id')
-    rating = data.get('rating')
-    jury_comment = data.get('jury_comment')
-
-    if not artwork_id or not rating:
-        return jsonify({'success': False, 'message': 'Неверные данные'}), 400
+    try:
+        entry = RatingEntry.from_json(request.get_json(silent=True))
+    except InvalidRating as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    try:
+        saved = RatingService(db).upsert(current_user.id, [entry])
+        completed = _complete_assignments(saved)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Ошибка базы данных {e}'}), 500
+    _rebalance_if_finished(completed)
 
-    # Проверяем существование работы
-    artwork = Artworks.query.get(artwork_id)
-    if not artwork:
+    if entry.artwork_id not in saved:
         return jsonify({'success': False, 'message': 'Работа не найдена'}), 404
 
-    # Проверяем диапазон оценки
-    if rating < 1 or rating > 10:
-        return jsonify({'success': False, 'message': 'Оценка должна быть от 1 до 10'}), 400
+    message = 'Комментарий обновлен' if entry.comment else 'Оценка сохранена'
+    return jsonify({'success': True, 'message': message})
 
-    # Ищем существующую оценку
-    existing_rating = Ratings.query.filter_by(
-        work_id=artwork_id,
-        jury_id=current_user.id
-    ).first()
 
-    if existing_rating:
-        # Обновляем существующую оценку
-        existing_rating.rate = rating
-        message = 'Оценка обновлена'
-    else:
-        # Создаем новую оценку
-        new_rating = Ratings(
-            work_id=artwork_id,
-            jury_id=current_user.id,
-            rate=rating,
-            jury_comment=jury_comment
-        )
-        db.session.add(new_rating)
-        message = 'Оценка сохранена'
-    if jury_comment:
-        existing_rating.jury_comment = jury_comment
-        message = 'Комментарий обновлен'
+@application_bp.route("/jury/rate/batch", methods=["POST"])
+@active_user_required
+@role_required('jury')
+def rate_artworks_batch():
+    """Пакетное сохранение оценок одним запросом и одной транзакцией"""
+    data = request.get_json(silent=True) or {}
+    items = data.get('ratings')
+    if not isinstance(items, list) or not items:
+        return jsonify({'success': False, 'message': 'Неверные данные'}), 400
+    if len(items) > MAX_BATCH_SIZE:
+        return jsonify({'success': False,
+                        'message': f'Не больше {MAX_BATCH_SIZE} оценок за раз'}), 400
+
+    entries = []
+    errors = []
+    for index, item in enumerate(items):
+        try:
+            entries.append(RatingEntry.from_json(item))
+        except InvalidRating as e:
+            errors.append({'index': index, 'message': str(e)})
+
     try:
+        saved = RatingService(db).upsert(current_user.id, entries)
+        completed = _complete_assignments(saved)
         db.session.commit()
-        return jsonify({'success': True, 'message': message})
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'message': f'Ошибка базы данных {e}'}), 500
+    _rebalance_if_finished(completed)
+
+    not_found = sorted({entry.artwork_id for entry in entries} - saved)
+    return jsonify({
+        'success': not errors and not not_found,
+        'saved': sorted(saved),
+        'not_found': not_found,
+        'errors': errors
+    })
@@ -4,7 +4,7 @@ from wtforms import PasswordField, StringField, SubmitField, BooleanField, TextA
 from wtforms.validators import DataRequired, Email, Length, EqualTo, ValidationError, NumberRange, Optional
 from flask_wtf.file import FileField, FileAllowed, FileRequired
 
-from app.models import Roles
+from app.utils.roles_cache import roles_cache
 
 
 class LoginForm(FlaskForm):
@@ -97,7 +97,7 @@ class RegistrationForm(FlaskForm):
     def __init__(self, *args, **kwargs):
         super(RegistrationForm, self).__init__(*args, **kwargs)
         # Динамически устанавливаем choices для ролей
-        available_roles = Roles.query.filter_by(access=True).all()
+        available_roles = [role for role in roles_cache.all().values() if role.access]
         # Используем display_name для отображения
         self.role_id.choices = [(role.id, role.display_name) for role in available_roles]
 
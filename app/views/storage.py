@@ -0,0 +1,50 @@
+import os
+
+from flask import Blueprint, abort, request, send_file
+
+from app.utils.minio_service import get_storage
+from app.utils.storage_backends import LocalFSBackend
+
+storage_bp = Blueprint("storage", __name__)
+
+
+@storage_bp.route("/<path:key>")
+def serve_object(key):
+    """Отдает файл локального хранилища по подписанному URL"""
+    backend = get_storage().backend
+    if not isinstance(backend, LocalFSBackend):
+        abort(404)
+
+    if not backend.verify(key, request.args.get('expires'), request.args.get('signature')):
+        abort(403)
+
+    info = backend.stat(key)
+    if info is None:
+        abort(404)
+
+    return send_file(backend.path(key), mimetype=info.content_type, max_age=31536000,
+                     conditional=True)
+
+
+@storage_bp.route("/", methods=["POST"])
+def upload_object():
+    """Принимает файл в локальное хранилище по подписанной политике POST"""
+    backend = get_storage().backend
+    if not isinstance(backend, LocalFSBackend):
+        abort(404)
+
+    if not backend.verify_post(request.form):
+        abort(403)
+
+    file = request.files.get('file')
+    if file is None:
+        abort(400)
+
+    file.stream.seek(0, os.SEEK_END)
+    size = file.stream.tell()
+    file.stream.seek(0)
+    if not 0 < size <= int(request.form['max_size']):
+        abort(400)
+
+    backend.put_stream(request.form['key'], file.stream, request.form['Content-Type'], size)
+    return '', 204
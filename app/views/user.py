@@ -1,20 +1,19 @@
 from flask import Blueprint, request, redirect, url_for, flash, render_template, abort
 from flask_login import current_user, login_user, logout_user
-from redis import Redis
-from rq import Queue
 import sqlalchemy as sa
 
 from app.extensions import db
-from app.models import Users, Roles
+from app.models import Users
 from app.views.forms import LoginForm, ForgotPasswordForm, RegistrationForm, ResetPasswordForm, EditProfileForm
-from app.tasks import send_verification_email, send_password_reset_email
+from app.utils.email_queue import EmailQueue, VERIFICATION, PASSWORD_RESET
+from app.utils.user_cache import user_cache
 from app.utils.user_verification import active_user_required
 from app.services.user_service import NewUser, UserService, UserExist, UserDbError
 from logger_setup import setup_logger
 
 logger = setup_logger('user_routes')
 user_bp = Blueprint("user", __name__)
-q = Queue(connection=Redis())
+email_queue = EmailQueue()
 
 
 @user_bp.route("/registration", methods=["GET", "POST"])
@@ -41,7 +40,7 @@ def registration():
             flash('Произошла ошибка при регистрации. Пожалуйста, попробуйте позже.', 'danger')
             return redirect(url_for('user.registration'))
 
-        q.enqueue(send_verification_email, user.email, user.f_name, user.verification_token)
+        email_queue.send_user_email(VERIFICATION, user.id)
         flash('Регистрация прошла успешно! На вашу почту отправлено письмо с подтверждением.', 'success')
         return render_template('verification_pending.html', email=user.email)
 
@@ -71,8 +70,9 @@ def verify_email(token):
             # Генерируем новый токен и отправляем новое письмо
             user.generate_verification_token()
             db.session.commit()
+            user_cache.invalidate(user.id)
 
-            q.enqueue(send_verification_email, user.email, user.f_name, user.verification_token)
+            email_queue.send_user_email(VERIFICATION, user.id, force=True)
 
             flash('Ссылка подтверждения истекла. На вашу почту отправлена новая ссылка.', 'warning')
             return render_template('verification_pending.html', email=user.email)
@@ -82,6 +82,7 @@ def verify_email(token):
         user.email_confirmed = True
         user.verification_token = None  # Удаляем использованный токен
         db.session.commit()
+        user_cache.invalidate(user.id)
 
         flash('✅ Ваш email успешно подтвержден! Теперь вы можете войти в систему.', 'success')
         return redirect(url_for('user.authorization'))
@@ -114,13 +115,14 @@ def resend_verification():
         return redirect(url_for('user.authorization'))
 
     try:
-        # Генерируем новый токен
-        user.generate_verification_token()
-        db.session.commit()
-
-        # Отправляем письмо
-        q.enqueue(send_verification_email, user.email, user.f_name, user.verification_token)
+        # Действующий токен переиспользуется, чтобы не обесценивать уже отправленные ссылки
+        _, regenerated = user.ensure_token('verification')
+        if regenerated:
+            db.session.commit()
+            user_cache.invalidate(user.id)
 
+        # Повторные нажатия, пока письмо ждет отправки, не создают новых задач
+        email_queue.send_user_email(VERIFICATION, user.id, force=regenerated)
 
         flash('Новое письмо с подтверждением отправлено на ваш email', 'success')
         return render_template('verification_pending.html', email=user.email)
@@ -194,11 +196,13 @@ def forgot_password():
         user = Users.query.filter_by(email=form.email.data).first()
 
         if user:
-            # Используем универсальный метод
-            reset_token = user.generate_token('password_reset')
-            db.session.commit()
+            # Действующий токен переиспользуется, новое письмо ставится,
+            # только если его еще нет в очереди
+            _, regenerated = user.ensure_token('password_reset')
+            if regenerated:
+                db.session.commit()
 
-            q.enqueue(send_password_reset_email, user.email, reset_token)
+            email_queue.send_user_email(PASSWORD_RESET, user.id, force=regenerated)
 
         flash('Если пользователь с таким email существует, ссылка для восстановления пароля будет отправлена',
               'success')
@@ -235,6 +239,7 @@ def reset_password(token):
             user.reset_password_sent_at = None
 
             db.session.commit()
+            user_cache.invalidate(user.id)
 
             # Авторизуем пользователя
             login_user(user)
@@ -258,9 +263,9 @@ def reset_password(token):
 def profile():
     if not current_user.is_authenticated:
         abort(403)
-    user = Users.query.filter_by(id=current_user.id).first()
-    role = Roles.query.filter_by(id=user.role_id).first()
-    return render_template('user_profile.html', user=user, role=role.display_name)
+    # Пользователь уже загружен load_user, роль берется из кэша
+    return render_template('user_profile.html', user=current_user,
+                           role=current_user.role.display_name)
 
 
 @user_bp.route("/edit-profile", methods=["GET", "POST"])
@@ -269,34 +274,39 @@ def edit_profile():
     form = EditProfileForm()
     if not current_user.is_authenticated:
         abort(403)
+    # Для редактирования нужна полная строка пользователя, а не снимок из кэша
+    user = current_user.load()
     if request.method == 'GET':
-        form.f_name.data = current_user.f_name
-        form.s_name.data = current_user.s_name
-        form.age.data = current_user.age
-        form.email.data = current_user.email
+        form.f_name.data = user.f_name
+        form.s_name.data = user.s_name
+        form.age.data = user.age
+        form.email.data = user.email
 
     if form.validate_on_submit():
         try:
-            email_changed = form.email.data != current_user.email
+            email_changed = form.email.data != user.email
 
             # Обновляем данные
-            current_user.f_name = form.f_name.data
-            current_user.s_name = form.s_name.data
-            current_user.age = form.age.data
-            current_user.about_user = request.form.get('about_user', '').strip()
+            user.f_name = form.f_name.data
+            user.s_name = form.s_name.data
+            user.age = form.age.data
+            user.about_user = request.form.get('about_user', '').strip()
 
             if email_changed:
                 # Логика смены email с подтверждением
-                current_user.email = form.email.data
-                current_user.email_confirmed = False
-                current_user.generate_verification_token()
-
-                q.enqueue(send_verification_email, current_user.email, current_user.f_name, current_user.verification_token)
+                user.email = form.email.data
+                user.email_confirmed = False
+                user.generate_verification_token()
                 flash('Email изменен. На новый адрес отправлено письмо для подтверждения.', 'warning')
             else:
                 flash('Профиль успешно обновлен!', 'success')
 
             db.session.commit()
+            user_cache.invalidate(user.id)
+
+            if email_changed:
+                # Задача читает адрес из базы, поэтому ставится после коммита
+                email_queue.send_user_email(VERIFICATION, user.id, force=True)
             return redirect(url_for('user.profile'))
 
         except Exception as e:
@@ -0,0 +1,60 @@
+"""
+Фоновые задачи: приложение Flask на процесс и RQ-воркер без fork.
+
+Запуск воркера:
+    rq worker --worker-class app.worker.AppWorker
+"""
+import os
+
+from flask import current_app, has_app_context
+from rq import SimpleWorker
+
+from app import create_app, mail
+from app.utils.mailer import get_smtp_session
+
+_app = None
+
+
+def get_app():
+    """
+    Приложение для фоновых задач: текущее, если задача выполняется внутри
+    приложения, иначе созданное один раз на процесс
+    """
+    global _app
+    if has_app_context():
+        return current_app._get_current_object()
+    if _app is None:
+        _app = create_app()
+    return _app
+
+
+def _reset_app_connections():
+    """Соединения пула базы нельзя делить с дочерним процессом после fork"""
+    if _app is not None:
+        from app.extensions import db
+        with _app.app_context():
+            db.engine.dispose(close=False)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_app_connections)
+
+
+class AppWorker(SimpleWorker):
+    """
+    RQ-воркер, выполняющий задачи в своем процессе: приложение создается
+    один раз при старте, SMTP-соединение переиспользуется между задачами
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.app = get_app()
+
+    def perform_job(self, job, queue):
+        with self.app.app_context():
+            return super().perform_job(job, queue)
+
+    def teardown(self):
+        with self.app.app_context():
+            get_smtp_session(mail).close()
+        super().teardown()
@@ -0,0 +1,347 @@
+"""
+Пропускная способность конвейера писем: сколько писем подтверждения email и
+восстановления пароля в секунду отправляют RQ-воркеры.
+
+Задачи ставятся теми же обработчиками, что и на сайте (регистрация и
+"забыли пароль" через тестовый клиент Flask), затем запускаются воркеры
+app.worker.AppWorker, письма принимает SMTP-приемник в этом же процессе.
+Redis - указанный в --redis-url, временный redis-server (если он установлен)
+или fakeredis в этом же процессе (нужны пакеты fakeredis и lupa). С fakeredis
+воркеры работают потоками одного процесса и делят одно SMTP-соединение,
+поэтому msgs/s не растет с числом воркеров; с настоящим Redis каждый воркер -
+отдельный процесс, как в рабочем окружении. База - временный файл SQLite.
+
+Задержка от постановки до доставки включает ожидание в очереди: все задачи
+ставятся до запуска воркеров, как при наплыве регистраций. CPU на письмо -
+процессорное время воркеров, деленное на число писем.
+
+Запуск:
+    python -m benchmarks.email_benchmark --count 500 --workers 1 2 4 --smtp-delay 20
+"""
+import argparse
+import atexit
+import multiprocessing
+import os
+import re
+import resource
+import shutil
+import socket
+import socketserver
+import subprocess
+import tempfile
+import threading
+import time
+
+PATHS = ('registration', 'forgot_password')
+PASSWORD = 'Benchmark1!'
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Минимальный SMTP-диалог без аутентификации и TLS"""
+
+    def reply(self, line):
+        self.wfile.write(line.encode('ascii') + b'\r\n')
+
+    def handle(self):
+        self.reply('220 localhost benchmark sink')
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('ascii', 'replace').strip()
+            verb = command[:4].upper()
+            if verb == 'EHLO':
+                self.reply('250-localhost')
+                self.reply('250 8BITMIME')
+            elif verb == 'MAIL':
+                recipients = []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                recipients.append(re.search(r'<(.*)>', command).group(1))
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                if self.server.delay:
+                    time.sleep(self.server.delay)
+                self.server.delivered(recipients)
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                # HELO, RSET, NOOP
+                self.reply('250 OK')
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """SMTP-приемник: запоминает время доставки письма каждому получателю"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, delay=0.0):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.delay = delay
+        self.deliveries = {}
+        self._lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def delivered(self, recipients):
+        now = time.monotonic()
+        with self._lock:
+            for recipient in recipients:
+                self.deliveries[recipient] = now
+
+    def reset(self):
+        with self._lock:
+            self.deliveries = {}
+
+
+def start_redis_server():
+    """Временный redis-server без сохранения на диск; возвращает его URL или None"""
+    if shutil.which('redis-server') is None:
+        return None
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    process = subprocess.Popen(
+        ['redis-server', '--port', str(port), '--bind', '127.0.0.1',
+         '--save', '', '--appendonly', 'no'],
+        stdout=subprocess.DEVNULL
+    )
+    atexit.register(process.terminate)
+
+    from redis import Redis, RedisError
+    url = f'redis://127.0.0.1:{port}/0'
+    for _ in range(50):
+        try:
+            Redis.from_url(url).ping()
+            return url
+        except RedisError:
+            time.sleep(0.1)
+    raise SystemExit('redis-server не запустился')
+
+
+def start_fake_redis():
+    """fakeredis в этом процессе; приложение получает его вместо пула соединений"""
+    try:
+        import fakeredis
+    except ImportError:
+        raise SystemExit('Нужен Redis (--redis-url, redis-server) или пакеты fakeredis и lupa')
+    import app.utils.task_queue as task_queue
+
+    server = fakeredis.FakeServer()
+    task_queue._pool = fakeredis.FakeRedis(server=server).connection_pool
+    return server
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(pct / 100 * len(values)) - 1))
+    return values[index]
+
+
+def prepare_database(app):
+    """Схема и роль участника во временной базе"""
+    from app.extensions import db
+    from app.models import Roles
+
+    with app.app_context():
+        db.create_all()
+        role = Roles.query.filter_by(title='participant').first()
+        if role is None:
+            role = Roles(title='participant', display_name='Участник', access=True)
+            db.session.add(role)
+            db.session.commit()
+        return role.id
+
+
+def create_users(app, emails, role_id):
+    """Подтвержденные пользователи для сценария восстановления пароля"""
+    from app.extensions import db
+    from app.models import Users
+
+    password_hash = Users.set_password(PASSWORD)
+    with app.app_context():
+        db.session.execute(db.insert(Users), [
+            {'email': email, 'password_hash': password_hash, 'f_name': 'Bench', 's_name': 'User',
+             'age': 30, 'role_id': role_id, 'status': 'active', 'email_confirmed': True}
+            for email in emails
+        ])
+        db.session.commit()
+
+
+def enqueue(client, path, emails, role_id):
+    """Запросы к обработчику path; возвращает {email: время постановки задачи}"""
+    enqueued = {}
+    for email in emails:
+        if path == 'registration':
+            response = client.post('/user/registration', data={
+                'name': 'Bench', 'second_name': 'User', 'email': email, 'age': 30,
+                'role_id': role_id, 'about': '', 'password': PASSWORD,
+                'confirm_password': PASSWORD, 'agree_terms': 'y'
+            })
+        else:
+            response = client.post('/user/forgot_password', data={'email': email})
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} для {email}: HTTP {response.status_code}")
+        enqueued[email] = time.monotonic()
+    return enqueued
+
+
+def run_worker(redis_url, queue_name):
+    from redis import Redis
+    from app.worker import AppWorker
+
+    worker = AppWorker([queue_name], connection=Redis.from_url(redis_url))
+    worker.work(burst=True, logging_level='WARNING')
+
+
+def run_worker_processes(redis_url, queue_name, workers):
+    """
+    Воркеры-процессы (наследуют созданное приложение через fork);
+    возвращает их процессорное время
+    """
+    def children_cpu():
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return usage.ru_utime + usage.ru_stime
+
+    context = multiprocessing.get_context('fork')
+    cpu_before = children_cpu()
+    processes = [context.Process(target=run_worker, args=(redis_url, queue_name))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    return children_cpu() - cpu_before
+
+
+def run_worker_threads(fake_server, queue_name, workers):
+    """Воркеры-потоки на общем fakeredis; возвращает их процессорное время"""
+    import fakeredis
+    from rq.timeouts import TimerDeathPenalty
+    from app.worker import AppWorker
+
+    class ThreadWorker(AppWorker):
+        # Сигналы доступны только главному потоку
+        death_penalty_class = TimerDeathPenalty
+
+        def _install_signal_handlers(self):
+            pass
+
+    cpu = []
+
+    def work():
+        started = time.thread_time()
+        ThreadWorker([queue_name], connection=fakeredis.FakeRedis(server=fake_server)).work(
+            burst=True, logging_level='WARNING'
+        )
+        cpu.append(time.thread_time() - started)
+
+    threads = [threading.Thread(target=work) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(cpu)
+
+
+def run_case(app, sink, redis, path, workers, count, role_id, case):
+    from app.utils.config import MailQueueConfig
+    from app.utils.task_queue import get_redis
+
+    with app.app_context():
+        get_redis().flushdb()
+    sink.reset()
+
+    emails = [f"bench-{case}-{i}@example.com" for i in range(count)]
+    if path == 'forgot_password':
+        create_users(app, emails, role_id)
+
+    started = time.monotonic()
+    enqueued = enqueue(app.test_client(), path, emails, role_id)
+    enqueue_rate = count / (time.monotonic() - started)
+
+    started = time.monotonic()
+    if isinstance(redis, str):
+        cpu = run_worker_processes(redis, MailQueueConfig.HIGH_QUEUE, workers)
+    else:
+        cpu = run_worker_threads(redis, MailQueueConfig.HIGH_QUEUE, workers)
+
+    deliveries = sink.deliveries
+    latencies = [deliveries[email] - enqueued[email] for email in emails if email in deliveries]
+    if not latencies:
+        raise RuntimeError('Ни одно письмо не доставлено')
+    elapsed = max(deliveries.values()) - started
+    return {
+        'delivered': len(latencies),
+        'enqueue_rate': enqueue_rate,
+        'rate': len(latencies) / elapsed,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'cpu': cpu / len(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=200, help='писем на каждый случай')
+    parser.add_argument('--workers', nargs='+', type=int, default=[1, 2, 4])
+    parser.add_argument('--path', nargs='+', default=list(PATHS), choices=PATHS)
+    parser.add_argument('--smtp-delay', type=float, default=0,
+                        help='задержка SMTP-сервера на письмо, мс')
+    parser.add_argument('--redis-url', help='Redis для очередей (по умолчанию - '
+                                            'временный redis-server или fakeredis)')
+    args = parser.parse_args()
+
+    sink = SMTPSink(delay=args.smtp_delay / 1000)
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    redis_url = args.redis_url or start_redis_server()
+    tmp = tempfile.mkdtemp(prefix='email-benchmark-')
+
+    # Настройки приложения читаются из окружения при импорте и в create_app
+    os.environ.update({
+        'DATABASE_REAL': f"sqlite:///{os.path.join(tmp, 'benchmark.db')}",
+        'REDIS_URL': redis_url or 'redis://127.0.0.1:6379/0',
+        'MAIL_SERVER': '127.0.0.1',
+        'MAIL_PORT': str(sink.port),
+        'MAIL_DEFAULT_SENDER': 'benchmark@example.com',
+        'STORAGE_BACKEND': 'local',
+        'LOCAL_STORAGE_ROOT': os.path.join(tmp, 'storage'),
+        'SECRET_KEY': os.getenv('SECRET_KEY', 'benchmark'),
+        'TASKS_FALLBACK': 'outbox',
+    })
+    from app.worker import get_app
+
+    redis = redis_url or start_fake_redis()
+    app = get_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    # Приемник работает без TLS
+    app.config['MAIL_USE_TLS'] = False
+    app.extensions['mail'].use_tls = False
+    role_id = prepare_database(app)
+
+    print(f"{'path':<16} {'workers':>7} {'msgs':>6} {'enq/s':>7} {'msgs/s':>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'cpu ms':>7}")
+
+    case = 0
+    for path in args.path:
+        for workers in args.workers:
+            case += 1
+            result = run_case(app, sink, redis, path, workers, args.count, role_id, case)
+            print(f"{path:<16} {workers:>7} {result['delivered']:>6} "
+                  f"{result['enqueue_rate']:>7.1f} {result['rate']:>8.1f} "
+                  f"{result['p50'] * 1000:>8.1f} {result['p95'] * 1000:>8.1f} "
+                  f"{result['p99'] * 1000:>8.1f} {result['cpu'] * 1000:>7.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Скорость подсчета итогов конкурса на синтетических матрицах оценок.
+
+Каждый член жюри оценивает долю работ; оценки смещены на индивидуальную
+"строгость" судьи, чтобы нормировка z-score работала на реалистичных данных.
+
+Запуск:
+    python -m benchmarks.results_benchmark --works 1000 10000 --jury 20 100 --coverage 0.5
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from app.services.results_service import compute_scores
+
+
+def synthetic_ratings(works, jury, nominations, coverage, seed):
+    """Массивы (work_ids, jury_ids, rates, nomination_ids) для works x jury, заполнение coverage"""
+    rng = np.random.default_rng(seed)
+    mask = rng.random((works, jury)) < coverage
+    work_index, jury_index = np.nonzero(mask)
+    quality = rng.normal(6, 1.5, works)
+    strictness = rng.normal(0, 1, jury)
+    rates = np.clip(np.rint(quality[work_index] + strictness[jury_index]
+                            + rng.normal(0, 1, work_index.size)), 1, 10)
+    nomination_of_work = rng.integers(1, nominations + 1, works)
+    return work_index + 1, jury_index + 1, rates.astype(np.int64), nomination_of_work[work_index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--works', nargs='+', type=int, default=[1000, 10000, 50000])
+    parser.add_argument('--jury', nargs='+', type=int, default=[20, 100])
+    parser.add_argument('--nominations', type=int, default=10)
+    parser.add_argument('--coverage', type=float, default=0.5,
+                        help='доля работ, оцененных каждым судьей')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'works':>7} {'jury':>5} {'ratings':>9} "
+          f"{'median ms':>10} {'min ms':>8} {'Mrates/s':>9}")
+
+    for works in args.works:
+        for jury in args.jury:
+            data = synthetic_ratings(works, jury, args.nominations, args.coverage, args.seed)
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                compute_scores(*data).winners()
+                timings.append(time.perf_counter() - started)
+            median = statistics.median(timings)
+            print(f"{works:>7} {jury:>5} {data[2].size:>9} {median * 1000:>10.1f} "
+                  f"{min(timings) * 1000:>8.1f} {data[2].size / median / 1e6:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Сравнение бэкендов хранилища работ: пропускная способность загрузки и
+задержки (p50/p99) при разных размерах файлов и числе параллельных загрузок.
+
+Запуск:
+    python -m benchmarks.storage_benchmark --backend local minio --sizes 1M 10M --concurrency 1 8
+"""
+import argparse
+import io
+import os
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+# Настройки хранилища читаются из окружения при импорте
+load_dotenv()
+
+from app.utils.minio_service import ArtworkStorage  # noqa: E402
+from app.utils.storage_backends import BACKENDS, create_backend  # noqa: E402
+
+UNITS = {'K': 1024, 'M': 1024 * 1024}
+
+
+def parse_size(value):
+    value = value.upper()
+    if value[-1] in UNITS:
+        return int(float(value[:-1]) * UNITS[value[-1]])
+    return int(value)
+
+
+def format_size(size):
+    for unit in ('M', 'K'):
+        if size >= UNITS[unit]:
+            return f"{size / UNITS[unit]:g}{unit}"
+    return str(size)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(pct / 100 * len(values)) - 1))
+    return values[index]
+
+
+def run_case(storage, prefix, payload, concurrency, count):
+    """Загружает count копий payload в concurrency потоков; возвращает (время, задержки)"""
+    def upload(i):
+        key = f"{prefix}/{uuid.uuid4().hex}.bin"
+        started = time.perf_counter()
+        result = storage.upload_stream(io.BytesIO(payload), key, 'application/octet-stream')
+        if not result['success']:
+            raise RuntimeError(result['error'])
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(upload, range(count)))
+    return time.perf_counter() - started, latencies
+
+
+def cleanup(storage, prefix):
+    for key in list(storage.list_prefix(prefix)):
+        storage.delete(key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', nargs='+', default=['local'], choices=sorted(BACKENDS))
+    parser.add_argument('--sizes', nargs='+', default=['256K', '1M', '10M'])
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 8, 32])
+    parser.add_argument('--count', type=int, default=64, help='загрузок на каждый случай')
+    parser.add_argument('--keep', action='store_true', help='не удалять загруженные объекты')
+    args = parser.parse_args()
+
+    print(f"{'backend':<8} {'size':>6} {'conc':>5} {'ops/s':>8} {'MB/s':>8} "
+          f"{'p50 ms':>8} {'p99 ms':>8}")
+
+    for backend_name in args.backend:
+        storage = ArtworkStorage(create_backend(backend_name))
+        prefix = f"benchmark/{uuid.uuid4().hex}"
+        try:
+            for size in map(parse_size, args.sizes):
+                payload = os.urandom(size)
+                for concurrency in args.concurrency:
+                    elapsed, latencies = run_case(storage, prefix, payload, concurrency, args.count)
+                    print(f"{backend_name:<8} {format_size(size):>6} {concurrency:>5} "
+                          f"{args.count / elapsed:>8.1f} "
+                          f"{size * args.count / elapsed / UNITS['M']:>8.1f} "
+                          f"{statistics.median(latencies) * 1000:>8.1f} "
+                          f"{percentile(latencies, 99) * 1000:>8.1f}")
+        finally:
+            if not args.keep:
+                cleanup(storage, prefix)
+
+
+if __name__ == '__main__':
+    main()